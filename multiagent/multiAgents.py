@@ -14,7 +14,10 @@
 
 from util import manhattanDistance
 from game import Directions
-import random, util
+import random, util, time
+import collections
+import concurrent.futures
+import layout
 
 from game import Agent
 from pacman import GameState
@@ -115,10 +118,72 @@ class MultiAgentSearchAgent(Agent):
     is another abstract class.
     """
 
-    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2'):
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', numProcesses = '1'):
         self.index = 0 # Pacman is always agent index 0
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
+        # With numProcesses > 1 the subtrees below the root are searched by a
+        # pool of worker processes; see getParallelRootValues.
+        self.numProcesses = int(numProcesses)
+        self.searchPool = None
+        self.searchPoolLayout = None
+
+    def rootValue(self, successor, alpha=-float('inf'), beta=float('inf')):
+        """
+        Returns the search value of successor, a state reached by one of
+        Pacman's moves from the root, searched with window (alpha, beta).
+        Agents that search root subtrees in parallel implement this.
+        """
+        util.raiseNotDefined()
+
+    def getParallelRootValues(self, gameState, actions, alpha=-float('inf'), beta=float('inf')):
+        """
+        Returns [self.rootValue(successor, alpha, beta)] for the successors of
+        gameState under each of Pacman's actions, searching the subtrees in a
+        pool of self.numProcesses worker processes.  Each worker receives the
+        layout and a copy of this agent once; states are shipped packed (see
+        GameState.pack).  The values are exactly those of the sequential
+        search, so the chosen action is too.
+        """
+        layoutText = tuple(gameState.data.layout.layoutText)
+        if self.searchPool == None or self.searchPoolLayout != layoutText:
+            self.shutdownSearchPool()
+            self.searchPool = concurrent.futures.ProcessPoolExecutor(
+                self.numProcesses, initializer=_initSearchWorker, initargs=(self, layoutText))
+            self.searchPoolLayout = layoutText
+        packedStates = [gameState.generateSuccessor(0, action).pack() for action in actions]
+        futures = [self.searchPool.submit(_searchRootSuccessor, packedState, alpha, beta)
+                   for packedState in packedStates]
+        return [future.result() for future in futures]
+
+    def shutdownSearchPool(self):
+        if self.searchPool != None:
+            self.searchPool.shutdown()
+            self.searchPool = None
+            self.searchPoolLayout = None
+
+    def final(self, state):
+        self.shutdownSearchPool()
+
+    def __getstate__(self):
+        # The pool stays behind when the agent is sent to a worker
+        state = self.__dict__.copy()
+        state['searchPool'] = None
+        state['searchPoolLayout'] = None
+        return state
+
+# The agent and layout a search worker process searches with
+_workerAgent = None
+_workerLayout = None
+
+def _initSearchWorker(agent, layoutText):
+    global _workerAgent, _workerLayout
+    _workerAgent = agent
+    _workerLayout = layout.Layout(list(layoutText))
+
+def _searchRootSuccessor(packedState, alpha, beta):
+    state = GameState.unpack(packedState, _workerLayout)
+    return _workerAgent.rootValue(state, alpha, beta)
 
 class MinimaxAgent(MultiAgentSearchAgent):
     """
@@ -149,6 +214,21 @@ class MinimaxAgent(MultiAgentSearchAgent):
         Returns whether or not the game state is a losing state
         """
         "*** YOUR CODE HERE ***"
+        actions = gameState.getLegalActions(0)
+        if self.numProcesses > 1:
+            successorValues = self.getParallelRootValues(gameState, actions)
+        else:
+            successorValues = (self.rootValue(gameState.generateSuccessor(0, action))
+                               for action in actions)
+        v = -float('inf')
+        for action, successorValue in zip(actions, successorValues):
+            if successorValue > v:
+                v = successorValue
+                finalAction = action
+        return finalAction
+
+    def rootValue(self, successor, alpha=-float('inf'), beta=float('inf')):
+        "Returns the minimax value of a successor of the root."
         def Value(state, depth, agentID):
             if agentID >= state.getNumAgents():
                 return Value(state, depth+1, 0)
@@ -161,36 +241,104 @@ class MinimaxAgent(MultiAgentSearchAgent):
         def MaxValue(state, depth, agentID):
             v = -float('inf')
             for action in state.getLegalActions(agentID):
-                successor = state.generateSuccessor(agentID, action)
+                successor = state.fastGenerateSuccessor(agentID, action)
                 v = max(v, Value(successor, depth, agentID+1))
             return v
         def MinValue(state, depth, agentID):
             v = float('inf')
             for action in state.getLegalActions(agentID):
-                successor = state.generateSuccessor(agentID, action)
+                successor = state.fastGenerateSuccessor(agentID, action)
                 v = min(v, Value(successor, depth, agentID+1))
             return v
-        
-        v = -float('inf')
-        for action in gameState.getLegalActions(0):
-            successor = gameState.generateSuccessor(0, action)
-            successorValue = Value(successor, 1, 1)
-            if successorValue > v:
-                v = successorValue
-                finalAction = action
-        return finalAction
 
+        return Value(successor, 1, 1)
+
+
+class TranspositionTable:
+    """
+    A size-bounded table of earlier search results, keyed on
+    (state, agentIndex, depth).  Each entry holds the value found, whether
+    that value is exact or only a lower/upper bound (alpha-beta searches
+    with a narrowed window only learn bounds), and the best action found.
+    Once maxSize entries are stored the least recently used one is evicted.
+    """
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self, maxSize=100000):
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()
+
+    def lookup(self, state, agentIndex, depth):
+        "Returns (value, flag, action) or None."
+        key = (state, agentIndex, depth)
+        entry = self.entries.get(key)
+        if entry != None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, state, agentIndex, depth, value, flag, action):
+        key = (state, agentIndex, depth)
+        self.entries[key] = (value, flag, action)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+class SearchTimeout(Exception):
+    "Raised inside a time-limited search when its budget runs out."
+    pass
 
 class AlphaBetaAgent(MultiAgentSearchAgent):
     """
     Your minimax agent with alpha-beta pruning (question 3)
+
+    Given a timeLimit (seconds per move, e.g. -a timeLimit=0.5) the agent
+    instead runs an iterative-deepening search with a transposition table of
+    at most tableSize entries; see getIterativeDeepeningAction.
     """
 
+    def __init__(self, evalFn='scoreEvaluationFunction', depth='2', timeLimit=None, tableSize='100000', numProcesses='1'):
+        MultiAgentSearchAgent.__init__(self, evalFn, depth, numProcesses)
+        self.timeLimit = None if timeLimit == None else float(timeLimit)
+        self.transpositionTable = TranspositionTable(int(tableSize))
+        self.searchDepth = 0  # Depth of the last completed iterative-deepening search
+
     def getAction(self, gameState: GameState):
         """
         Returns the minimax action using self.depth and self.evaluationFunction
         """
+        if self.timeLimit != None:
+            return self.getIterativeDeepeningAction(gameState)
         "*** YOUR CODE HERE ***"
+        alpha = -float('inf')
+        beta = float('inf')
+        actions = gameState.getLegalActions(0)
+        successorValues = None
+        if self.numProcesses > 1 and len(actions) > 1:
+            # Young brothers wait: search the eldest subtree here, then its
+            # siblings in parallel with the bound it gives
+            eldestValue = self.rootValue(gameState.generateSuccessor(0, actions[0]), alpha, beta)
+            successorValues = [eldestValue] + self.getParallelRootValues(
+                gameState, actions[1:], max(alpha, eldestValue), beta)
+        for i, action in enumerate(actions):
+            if successorValues == None:
+                successor = gameState.generateSuccessor(0, action)
+                successorValue = self.rootValue(successor, alpha, beta)
+            else:
+                successorValue = successorValues[i]
+            if successorValue > beta:
+                break
+            if successorValue > alpha:
+                alpha = successorValue
+                finalAction = action
+        return finalAction
+
+    def rootValue(self, successor, alpha=-float('inf'), beta=float('inf')):
+        "Returns the alpha-beta value of a successor of the root."
         def Value(state, depth, agentID, alpha, beta):
             if agentID >= state.getNumAgents():
                 return Value(state, depth+1, 0, alpha, beta)
@@ -203,7 +351,7 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         def MaxValue(state, depth, agentID, alpha, beta):
             v = -float('inf')
             for action in state.getLegalActions(agentID):
-                successor = state.generateSuccessor(agentID, action)
+                successor = state.fastGenerateSuccessor(agentID, action)
                 v = max(v, Value(successor, depth, agentID+1, alpha, beta))
                 if v > beta:
                     return v
@@ -212,23 +360,112 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         def MinValue(state, depth, agentID, alpha, beta):
             v = float('inf')
             for action in state.getLegalActions(agentID):
-                successor = state.generateSuccessor(agentID, action)
+                successor = state.fastGenerateSuccessor(agentID, action)
                 v = min(v, Value(successor, depth, agentID+1, alpha, beta))
                 if v < alpha:
                     return v
                 beta = min(beta, v)
             return v
-        
-        alpha = -float('inf')
-        beta = float('inf')
-        for action in gameState.getLegalActions(0):
-            successor = gameState.generateSuccessor(0, action)
-            successorValue = Value(successor, 1, 1, alpha, beta)
-            if successorValue > beta:
+
+        return Value(successor, 1, 1, alpha, beta)
+
+    def getIterativeDeepeningAction(self, gameState: GameState):
+        """
+        Anytime alpha-beta search.  Searches to depth 1, 2, 3, ... until
+        self.timeLimit seconds have passed and returns the best root action of
+        the deepest search that finished; depth 1 always finishes.
+
+        Every node looks itself up in the transposition table, which is kept
+        across iterations and moves.  A stored exact value ends the search of
+        the node and a stored bound narrows its window.  Failing that, the
+        best action the previous, one ply shallower iteration found for the
+        node is tried first, so each iteration starts down the principal
+        variation of the one before.
+        """
+        legalActions = gameState.getLegalActions(0)
+        if len(legalActions) == 1:
+            return legalActions[0]
+
+        table = self.transpositionTable
+        numAgents = gameState.getNumAgents()
+        deadline = time.time() + self.timeLimit
+        timed = [False]
+
+        def Value(state, depth, agentID, alpha, beta):
+            if agentID >= numAgents:
+                agentID = 0
+                depth -= 1
+            if state.isWin() or state.isLose() or depth == 0:
+                return self.evaluationFunction(state), None
+            if timed[0] and time.time() > deadline:
+                raise SearchTimeout()
+
+            firstAction = None
+            entry = table.lookup(state, agentID, depth)
+            if entry != None:
+                value, flag, firstAction = entry
+                if flag == TranspositionTable.EXACT:
+                    return value, firstAction
+                if flag == TranspositionTable.LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, firstAction
+            else:
+                entry = table.lookup(state, agentID, depth - 1)
+                if entry != None:
+                    firstAction = entry[2]
+
+            actions = state.getLegalActions(agentID)
+            if firstAction in actions:
+                actions.remove(firstAction)
+                actions.insert(0, firstAction)
+
+            originalAlpha, originalBeta = alpha, beta
+            bestAction = None
+            if agentID == 0:
+                v = -float('inf')
+                for action in actions:
+                    successor = state.fastGenerateSuccessor(agentID, action)
+                    successorValue = Value(successor, depth, agentID+1, alpha, beta)[0]
+                    if successorValue > v:
+                        v, bestAction = successorValue, action
+                    alpha = max(alpha, v)
+                    if alpha >= beta:
+                        break
+            else:
+                v = float('inf')
+                for action in actions:
+                    successor = state.fastGenerateSuccessor(agentID, action)
+                    successorValue = Value(successor, depth, agentID+1, alpha, beta)[0]
+                    if successorValue < v:
+                        v, bestAction = successorValue, action
+                    beta = min(beta, v)
+                    if alpha >= beta:
+                        break
+
+            if v <= originalAlpha:
+                flag = TranspositionTable.UPPER
+            elif v >= originalBeta:
+                flag = TranspositionTable.LOWER
+            else:
+                flag = TranspositionTable.EXACT
+            table.store(state, agentID, depth, v, flag, bestAction)
+            return v, bestAction
+
+        finalAction = legalActions[0]
+        depth = 1
+        while True:
+            try:
+                finalAction = Value(gameState, depth, 0, -float('inf'), float('inf'))[1]
+            except SearchTimeout:
                 break
-            if successorValue > alpha:
-                alpha = successorValue
-                finalAction = action
+            self.searchDepth = depth
+            if time.time() > deadline:
+                break
+            timed[0] = True
+            depth += 1
         return finalAction
 
 class ExpectimaxAgent(MultiAgentSearchAgent):
@@ -244,6 +481,21 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         legal moves.
         """
         "*** YOUR CODE HERE ***"
+        actions = gameState.getLegalActions(0)
+        if self.numProcesses > 1:
+            successorValues = self.getParallelRootValues(gameState, actions)
+        else:
+            successorValues = (self.rootValue(gameState.generateSuccessor(0, action))
+                               for action in actions)
+        v = -float('inf')
+        for action, successorValue in zip(actions, successorValues):
+            if successorValue > v:
+                v = successorValue
+                finalAction = action
+        return finalAction
+
+    def rootValue(self, successor, alpha=-float('inf'), beta=float('inf')):
+        "Returns the expectimax value of a successor of the root."
         def Value(state, depth, agentID):
             if agentID >= state.getNumAgents():
                 return Value(state, depth+1, 0)
@@ -256,26 +508,18 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         def MaxValue(state, depth, agentID):
             v = -float('inf')
             for action in state.getLegalActions(agentID):
-                successor = state.generateSuccessor(agentID, action)
+                successor = state.fastGenerateSuccessor(agentID, action)
                 v = max(v, Value(successor, depth, agentID+1))
             return v
         def ExpValue(state, depth, agentID):
             v = 0
             actions = state.getLegalActions(agentID)
             for action in actions:
-                successor = state.generateSuccessor(agentID, action)
+                successor = state.fastGenerateSuccessor(agentID, action)
                 v += Value(successor, depth, agentID+1)/len(actions)
             return v
-        # print("root-",gameState.getPacmanPosition())
-        v = -float('inf')
-        for action in gameState.getLegalActions(0):
-            successor = gameState.generateSuccessor(0, action)
-            successorValue = Value(successor, 1, 1)
-            # print(action, successorValue)
-            if successorValue > v:
-                v = successorValue
-                finalAction = action
-        return finalAction
+
+        return Value(successor, 1, 1)
 
 def betterEvaluationFunction(currentGameState: GameState):
     """
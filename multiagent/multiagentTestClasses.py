@@ -28,7 +28,7 @@ from pprint import PrettyPrinter
 pp = PrettyPrinter()
 
 from game import Agent
-from pacman import GameState
+from pacman import GameState, ExplorationTracker
 from ghostAgents import RandomGhost, DirectionalGhost
 import random
 import math
@@ -56,6 +56,9 @@ class MultiagentTreeState(object):
         self.problem.generatedStates.add(successor)
         return MultiagentTreeState(self.problem, successor)
 
+    # Tree states share nothing worth copying; the lean path is the same one
+    fastGenerateSuccessor = generateSuccessor
+
     def getScore(self):
         if VERBOSE:
             print("getScore(%s) -> %s" %
@@ -345,8 +348,13 @@ class PacmanGameTreeTest(testClasses.TestCase):
                            altDepthActions, partialPlyBugActions)
         # check return codes and assign grades
         disp = self.question.getDisplay()
-        stats = run(lay, self.layout_name, pac, [DirectionalGhost(
-            i + 1) for i in range(2)], disp, name=self.alg)
+        # count the states the student agent generates, for this test only
+        previousTracker = GameState.setExplorationTracker(ExplorationTracker())
+        try:
+            stats = run(lay, self.layout_name, pac, [DirectionalGhost(
+                i + 1) for i in range(2)], disp, name=self.alg)
+        finally:
+            GameState.setExplorationTracker(previousTracker)
         if stats['timeouts'] > 0:
             self.addMessage('Agent timed out on smallClassic.  No credit')
             return self.testFail(grades)
@@ -395,8 +403,13 @@ class PacmanGameTreeTest(testClasses.TestCase):
             ourPacOptions = {}
         pac = PolyAgent(self.seed, multiAgents, ourPacOptions, self.depth)
         disp = self.question.getDisplay()
-        run(lay, self.layout_name, pac, [DirectionalGhost(
-            i + 1) for i in range(2)], disp, name=self.alg)
+        # count the states our agents generate, for this run only
+        previousTracker = GameState.setExplorationTracker(ExplorationTracker())
+        try:
+            run(lay, self.layout_name, pac, [DirectionalGhost(
+                i + 1) for i in range(2)], disp, name=self.alg)
+        finally:
+            GameState.setExplorationTracker(previousTracker)
         (optimalActions, altDepthActions, partialPlyBugActions) = pac.getTraces()
         # recover traces and record to file
         handle = open(filePath, 'w')
@@ -398,6 +398,9 @@ def parseOptions():
     optParser.add_option('-i', '--iterations',action='store',
                          type='int',dest='iters',default=10,
                          metavar="K", help='Number of rounds of value iteration (default %default)')
+    optParser.add_option('--tolerance',action='store',
+                         type='float',dest='tolerance',default=None,
+                         metavar="T", help='Stop value or policy iteration once every value is within T of optimal')
     optParser.add_option('-k', '--episodes',action='store',
                          type='int',dest='episodes',default=1,
                          metavar="K", help='Number of epsiodes of the MDP to run (default %default)')
@@ -408,7 +411,7 @@ def parseOptions():
                          help='Request a window width of X pixels *per grid cell* (default %default)')
     optParser.add_option('-a', '--agent',action='store', metavar="A",
                          type='string',dest='agent',default="random",
-                         help='Agent type (options are \'random\', \'value\' and \'q\', default %default)')
+                         help='Agent type (options are \'random\', \'value\', \'compiledvalue\', \'gaussseidel\', \'policy\', \'modifiedpolicy\' and \'q\', default %default)')
     optParser.add_option('-t', '--text',action='store_true',
                          dest='textDisplay',default=False,
                          help='Use text-only ASCII display')
@@ -482,7 +485,17 @@ if __name__ == '__main__':
     import valueIterationAgents, qlearningAgents
     a = None
     if opts.agent == 'value':
-        a = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, opts.iters)
+        a = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, opts.iters, opts.tolerance)
+    elif opts.agent == 'compiledvalue':
+        a = valueIterationAgents.CompiledValueIterationAgent(mdp, opts.discount, opts.iters, opts.tolerance)
+    elif opts.agent == 'gaussseidel':
+        a = valueIterationAgents.GaussSeidelValueIterationAgent(mdp, opts.discount, opts.iters, opts.tolerance)
+    elif opts.agent == 'policy':
+        tolerance = opts.tolerance if opts.tolerance != None else valueIterationAgents.POLICY_TOLERANCE
+        a = valueIterationAgents.PolicyIterationAgent(mdp, opts.discount, opts.iters, tolerance)
+    elif opts.agent == 'modifiedpolicy':
+        tolerance = opts.tolerance if opts.tolerance != None else valueIterationAgents.POLICY_TOLERANCE
+        a = valueIterationAgents.ModifiedPolicyIterationAgent(mdp, opts.discount, opts.iters, tolerance)
     elif opts.agent == 'q':
         #env.getPossibleActions, opts.discount, opts.learningRate, opts.epsilon
         #simulationFn = lambda agent, state: simulation.GridworldSimulation(agent,state,mdp)
@@ -516,6 +529,8 @@ if __name__ == '__main__':
         a = valueIterationAgents.PrioritizedSweepingValueIterationAgent(mdp, opts.discount, opts.iters)
     else:
         if not opts.manual: raise Exception('Unknown agent type: '+opts.agent)
+    if opts.tolerance != None and hasattr(a, 'residuals') and len(a.residuals) > 0:
+        print('Value iteration ran %d sweeps (final residual %g)' % (a.sweeps, a.residuals[-1]))
 
 
     ###########################
@@ -523,7 +538,7 @@ if __name__ == '__main__':
     ###########################
     # DISPLAY Q/V VALUES BEFORE SIMULATION OF EPISODES
     try:
-        if not opts.manual and opts.agent in ('value', 'asynchvalue', 'priosweepvalue'):
+        if not opts.manual and opts.agent in ('value', 'compiledvalue', 'gaussseidel', 'policy', 'modifiedpolicy', 'asynchvalue', 'priosweepvalue'):
             if opts.valueSteps:
                 for i in range(opts.iters):
                     tempAgent = valueIterationAgents.ValueIterationAgent(mdp, opts.discount, i)
@@ -545,7 +560,7 @@ if __name__ == '__main__':
         if opts.manual and opts.agent == None:
             displayCallback = lambda state: display.displayNullValues(state)
         else:
-            if opts.agent in ('random', 'value', 'asynchvalue', 'priosweepvalue'):
+            if opts.agent in ('random', 'value', 'compiledvalue', 'gaussseidel', 'policy', 'modifiedpolicy', 'asynchvalue', 'priosweepvalue'):
                 displayCallback = lambda state: display.displayValues(a, state, "CURRENT VALUES")
             if opts.agent == 'q': displayCallback = lambda state: display.displayQValues(a, state, "CURRENT Q-VALUES")
 
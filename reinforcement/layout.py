@@ -14,11 +14,16 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import BitGrid
+import array
+import hashlib
 import os
+import pickle
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+MAZE_DISTANCE_CACHE = {}
 
 
 class Layout:
@@ -30,13 +35,14 @@ class Layout:
         self.width = len(layoutText[0])
         self.height = len(layoutText)
         self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.food = BitGrid(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self._mazeDistances = None  # Filled in by getMazeDistances
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -93,11 +99,38 @@ class Layout:
         row, col = [int(x) for x in pacPos]
         return ghostPos in self.visibility[row][col][pacDirection]
 
+    def getMazeDistances(self, cacheDir=None):
+        """
+        Returns the MazeDistances index for this layout's walls.  It is built
+        once per wall signature and shared by every layout with the same
+        walls.  Given a cacheDir, the index is also loaded from or saved to
+        a file there named after the signature.  The walls are only hashed
+        the first time; after that the layout keeps its own reference.
+        """
+        if self._mazeDistances != None:
+            return self._mazeDistances
+        signature = MazeDistances.wallSignature(self.walls)
+        if signature not in MAZE_DISTANCE_CACHE:
+            distances = None
+            if cacheDir != None:
+                path = os.path.join(cacheDir, signature + '.dist')
+                if os.path.exists(path):
+                    distances = MazeDistances.load(path)
+            if distances == None:
+                distances = MazeDistances(self.walls)
+                if cacheDir != None:
+                    distances.save(path)
+            MAZE_DISTANCE_CACHE[signature] = distances
+        self._mazeDistances = MAZE_DISTANCE_CACHE[signature]
+        return self._mazeDistances
+
     def __str__(self):
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        layout = Layout(self.layoutText[:])
+        layout._mazeDistances = self._mazeDistances  # Same walls
+        return layout
 
     def processLayoutText(self, layoutText):
         """
@@ -137,6 +170,93 @@ class Layout:
             self.numGhosts += 1
 
 
+class MazeDistances:
+    """
+    The maze distance between every pair of open cells of a wall grid,
+    found with one breadth-first search per cell.  Cells are numbered in
+    column order (see cellIds); distances[a * numCells + b] is the distance
+    from cell a to cell b, so lookups are a dictionary access and an array
+    index.
+    """
+
+    def __init__(self, walls=None):
+        if walls == None:  # Filled in by load
+            return
+        self.setCells(walls.asList(False))
+        neighbors = []
+        for x, y in self.positions:
+            adjacent = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+            neighbors.append([self.cellIds[pos] for pos in adjacent if pos in self.cellIds])
+
+        numCells = self.numCells
+        distances = array.array('i', [-1]) * (numCells * numCells)
+        for source in range(numCells):
+            row = source * numCells
+            distances[row + source] = 0
+            frontier = [source]
+            depth = 0
+            while frontier:
+                depth += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for neighbor in neighbors[cell]:
+                        if distances[row + neighbor] < 0:
+                            distances[row + neighbor] = depth
+                            nextFrontier.append(neighbor)
+                frontier = nextFrontier
+        self.distances = distances
+
+    def setCells(self, positions):
+        self.positions = positions
+        self.numCells = len(positions)
+        self.cellIds = dict((pos, i) for i, pos in enumerate(positions))
+
+    def __contains__(self, pos):
+        return pos in self.cellIds
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open cells, or infinity if
+        neither can be reached from the other.  Raises KeyError for a
+        position that is not an open cell.
+        """
+        distance = self.distances[self.cellIds[pos1] * self.numCells + self.cellIds[pos2]]
+        if distance < 0:
+            return float('inf')
+        return distance
+
+    def getDistancesFrom(self, pos):
+        """
+        Returns the distances from pos to every cell, indexed by cell id;
+        unreachable cells hold -1.
+        """
+        row = self.cellIds[pos] * self.numCells
+        return self.distances[row:row + self.numCells]
+
+    def save(self, path):
+        f = open(path, 'wb')
+        try:
+            pickle.dump((self.positions, self.distances), f, pickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+
+    def load(path):
+        f = open(path, 'rb')
+        try:
+            positions, distances = pickle.load(f)
+        finally:
+            f.close()
+        mazeDistances = MazeDistances()
+        mazeDistances.setCells(positions)
+        mazeDistances.distances = distances
+        return mazeDistances
+    load = staticmethod(load)
+
+    def wallSignature(walls):
+        return hashlib.sha1(str(walls).encode()).hexdigest()
+    wallSignature = staticmethod(wallSignature)
+
+
 def getLayout(name, back=2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
@@ -15,6 +15,7 @@
 from game import Directions, Agent, Actions
 
 import random,util,time
+import array
 
 class ValueEstimationAgent(Agent):
     """
@@ -131,6 +132,46 @@ class ReinforcementAgent(ValueEstimationAgent):
         """
         self.episodeRewards += deltaReward
         self.update(state,action,nextState,deltaReward)
+        if self.replayBuffer != None and self.alpha > 0:
+            self.replayBuffer.add(state, action, nextState, deltaReward)
+            self.replayExperience()
+
+    def updateBatch(self, states, actions, nextStates, rewards):
+        """
+          Applies many transitions in order.  Agents with a faster way to
+          do this can override it.
+        """
+        for state, action, nextState, reward in zip(states, actions, nextStates, rewards):
+            self.update(state, action, nextState, reward)
+
+    def getTDError(self, state, action, nextState, reward):
+        """
+          Returns reward + discount * V(nextState) - Q(state, action).
+        """
+        return reward + self.discount * self.getValue(nextState) - self.getQValue(state, action)
+
+    def replayExperience(self):
+        """
+          Replays replayRatio stored transitions per observed transition on
+          average, sampled from the replay buffer.  With a prioritized
+          buffer each replayed transition's priority becomes the size of
+          its temporal-difference error just before it is replayed.
+        """
+        self.replayCredit += self.replayRatio
+        count = int(self.replayCredit)
+        if count == 0:
+            return
+        self.replayCredit -= count
+        indices = self.replayBuffer.sample(count)
+        transitions = self.replayBuffer.getTransitions(indices)
+        if isinstance(self.replayBuffer, PrioritizedReplayBuffer):
+            errors = []
+            for state, action, nextState, reward in zip(*transitions):
+                errors.append(abs(self.getTDError(state, action, nextState, reward)))
+                self.update(state, action, nextState, reward)
+            self.replayBuffer.updatePriorities(indices, errors)
+        else:
+            self.updateBatch(*transitions)
 
     def startEpisode(self):
         """
@@ -160,7 +201,8 @@ class ReinforcementAgent(ValueEstimationAgent):
     def isInTesting(self):
         return not self.isInTraining()
 
-    def __init__(self, actionFn = None, numTraining=100, epsilon=0.5, alpha=0.5, gamma=1):
+    def __init__(self, actionFn = None, numTraining=100, epsilon=0.5, alpha=0.5, gamma=1,
+                 replaySize=0, replayRatio=1, replayPriority=0):
         """
         actionFn: Function which takes a state and returns the list of legal actions
 
@@ -168,6 +210,9 @@ class ReinforcementAgent(ValueEstimationAgent):
         epsilon  - exploration rate
         gamma    - discount factor
         numTraining - number of training episodes, i.e. no learning after these many episodes
+        replaySize - how many past transitions to keep for experience replay (0 turns replay off)
+        replayRatio - stored transitions replayed per observed transition, on average
+        replayPriority - how strongly replay favors transitions with large errors (0 samples uniformly)
         """
         if actionFn == None:
             actionFn = lambda state: state.getLegalActions()
@@ -179,6 +224,14 @@ class ReinforcementAgent(ValueEstimationAgent):
         self.epsilon = float(epsilon)
         self.alpha = float(alpha)
         self.discount = float(gamma)
+        self.replayBuffer = None
+        if int(replaySize) > 0:
+            if float(replayPriority) > 0:
+                self.replayBuffer = PrioritizedReplayBuffer(int(replaySize), float(replayPriority))
+            else:
+                self.replayBuffer = ReplayBuffer(int(replaySize))
+        self.replayRatio = float(replayRatio)
+        self.replayCredit = 0.0
 
     ################################
     # Controls needed for Crawler  #
@@ -256,3 +309,120 @@ class ReinforcementAgent(ValueEstimationAgent):
         if self.episodesSoFar == self.numTraining:
             msg = 'Training Done (turning off epsilon and alpha)'
             print('%s\n%s' % (msg,'-' * len(msg)))
+
+class ReplayBuffer:
+    """
+      A ring buffer of the last capacity transitions for experience
+      replay.  Each field of the transitions is kept in its own list (the
+      rewards in a packed array), and slot next is overwritten first once
+      the buffer is full.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.states = [None] * capacity
+        self.actions = [None] * capacity
+        self.nextStates = [None] * capacity
+        self.rewards = array.array('d', [0.0]) * capacity
+        self.next = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, nextState, reward):
+        """
+          Stores a transition and returns the slot it went into.
+        """
+        slot = self.next
+        self.states[slot] = state
+        self.actions[slot] = action
+        self.nextStates[slot] = nextState
+        self.rewards[slot] = reward
+        self.next = (slot + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        return slot
+
+    def sample(self, count):
+        """
+          Returns count slots drawn uniformly, with replacement.
+        """
+        size = self.size
+        return [int(random.random() * size) for i in range(count)]
+
+    def getTransitions(self, slots):
+        """
+          Returns the states, actions, next states and rewards stored in
+          slots, as four parallel lists.
+        """
+        return ([self.states[slot] for slot in slots], [self.actions[slot] for slot in slots],
+                [self.nextStates[slot] for slot in slots], [self.rewards[slot] for slot in slots])
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+      A ReplayBuffer that samples each transition with probability
+      proportional to its priority raised to the power exponent.  New
+      transitions get the largest priority seen so far, so each is
+      replayed soon at least once.
+
+      The weights sit in a sum tree: a binary tree in one array where
+      every node holds the sum of its two children and the leaves hold
+      the slots' weights.  Both sampling a slot and changing a weight walk
+      one root-to-leaf path, so they take O(log capacity) time.
+    """
+    def __init__(self, capacity, exponent=0.6, minPriority=1e-3):
+        ReplayBuffer.__init__(self, capacity)
+        self.exponent = exponent
+        self.minPriority = minPriority
+        self.maxPriority = 1.0
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.tree = array.array('d', [0.0]) * (2 * self.leaves)
+
+    def add(self, state, action, nextState, reward):
+        slot = ReplayBuffer.add(self, state, action, nextState, reward)
+        self.setPriority(slot, self.maxPriority)
+        return slot
+
+    def setPriority(self, slot, priority):
+        priority = max(priority, self.minPriority)
+        if priority > self.maxPriority:
+            self.maxPriority = priority
+        tree = self.tree
+        node = self.leaves + slot
+        tree[node] = priority ** self.exponent
+        # Re-add each parent from its children rather than adding the
+        # change, so rounding errors cannot build up over many updates
+        node //= 2
+        while node >= 1:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def updatePriorities(self, slots, priorities):
+        for slot, priority in zip(slots, priorities):
+            self.setPriority(slot, priority)
+
+    def getTotal(self):
+        return self.tree[1]
+
+    def sample(self, count):
+        """
+          Returns count slots drawn in proportion to their weights.  The
+          total weight is cut into count equal strata with one draw in
+          each, which spreads a batch over the buffer more evenly than
+          independent draws.
+        """
+        tree, leaves = self.tree, self.leaves
+        stratum = tree[1] / count
+        slots = []
+        for i in range(count):
+            mass = (i + random.random()) * stratum
+            node = 1
+            while node < leaves:
+                node *= 2
+                if mass >= tree[node] and tree[node + 1] > 0:
+                    mass -= tree[node]
+                    node += 1
+            slots.append(node - leaves)
+        return slots
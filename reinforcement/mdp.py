@@ -13,6 +13,15 @@
 
 
 import random
+import array
+import collections
+from itertools import repeat
+from operator import add, mul, sub
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+except ImportError:
+    scipy = None
 
 class MarkovDecisionProcess:
 
@@ -65,3 +74,322 @@ class MarkovDecisionProcess:
         are equivalent.
         """
         abstract
+
+class CompiledMDP:
+    """
+    A finite MarkovDecisionProcess flattened into index arrays once, so that
+    value and policy computations no longer call back into the MDP for
+    every state, action and sweep.
+
+    States are numbered in getStates() order (stateIds) and actions in order
+    of first appearance (actionIds).  Each (state, action) pair is a row,
+    row = stateId * numActions + actionId, and actionMask[row] is 1 when the
+    action is legal in the state.  The transitions P[s, a, s'] are stored
+    sparse, in compressed sparse row form: row r's entries are rowStarts[r]
+    up to rowStarts[r + 1] of nextStates and probs, and rewards holds
+    R[s, a, s'] for the same entries.
+
+    Value arguments are sequences of state values indexed by state id.
+    """
+    def __init__(self, mdp):
+        self.states = list(mdp.getStates())
+        self.stateIds = dict((state, i) for i, state in enumerate(self.states))
+        self.actions = []
+        self.actionIds = {}
+        self.stateActions = []  # Legal action ids, in the order the MDP lists them
+        for state in self.states:
+            actionIds = []
+            for action in mdp.getPossibleActions(state):
+                if action not in self.actionIds:
+                    self.actionIds[action] = len(self.actions)
+                    self.actions.append(action)
+                actionIds.append(self.actionIds[action])
+            self.stateActions.append(actionIds)
+        self.numStates = numStates = len(self.states)
+        self.numActions = numActions = len(self.actions)
+        self.terminal = array.array('b', [bool(mdp.isTerminal(state)) for state in self.states])
+        self.noActionStates = [s for s in range(numStates) if len(self.stateActions[s]) == 0]
+
+        self.actionMask = array.array('b', [0]) * (numStates * numActions)
+        self.rowStarts = array.array('l', [0])
+        self.nextStates = array.array('l')
+        self.probs = array.array('d')
+        self.rewards = array.array('d')
+        stateIds = self.stateIds
+        for s, state in enumerate(self.states):
+            legal = set(self.stateActions[s])
+            for a, action in enumerate(self.actions):
+                if a in legal:
+                    self.actionMask[s * numActions + a] = 1
+                    for nextState, prob in mdp.getTransitionStatesAndProbs(state, action):
+                        self.nextStates.append(stateIds[nextState])
+                        self.probs.append(prob)
+                        self.rewards.append(mdp.getReward(state, action, nextState))
+                self.rowStarts.append(len(self.nextStates))
+
+        rowStarts = self.rowStarts
+        self.rowSlices = [slice(rowStarts[row], rowStarts[row + 1]) for row in range(numStates * numActions)]
+        # Added to each row's sum, so illegal actions never win a max
+        self.rowPenalties = [0.0 if legal else float('-inf') for legal in self.actionMask]
+
+    def getRow(self, state, action):
+        return self.stateIds[state] * self.numActions + self.actionIds[action]
+
+    def computeQValues(self, values, discount):
+        """
+        Returns the Q-value of every row under values, with -inf for illegal
+        actions.  A row's Q-value sums prob * (reward + discount * value)
+        over its entries in order, exactly as
+        ValueIterationAgent.computeQValueFromValues does.  Each step runs
+        over all rows or entries at once inside map, never in a Python loop.
+        """
+        discountedValues = list(map(mul, repeat(discount), values))
+        entries = list(map(mul, self.probs,
+                           map(add, self.rewards, map(discountedValues.__getitem__, self.nextStates))))
+        return list(map(add, map(sum, map(entries.__getitem__, self.rowSlices)), self.rowPenalties))
+
+    def computeStateValues(self, qValues, values):
+        """
+        Returns each state's largest Q-value.  States with no legal actions
+        keep their entry in values.
+        """
+        numActions = self.numActions
+        if numActions == 0:
+            return list(values)
+        if numActions == 1:
+            newValues = list(qValues)
+        else:
+            newValues = list(map(max, *[qValues[a::numActions] for a in range(numActions)]))
+        for s in self.noActionStates:
+            newValues[s] = values[s]
+        return newValues
+
+    def valueIteration(self, discount, iterations, values=None, threshold=None, residuals=None):
+        """
+        Runs up to iterations synchronous Bellman backups, starting from
+        values (all zero by default), and returns the new values.  Each
+        sweep's residual, the largest change it makes to a value, is
+        appended to residuals when given.  The sweeps stop early once a
+        residual is at or below threshold.
+        """
+        if values == None:
+            values = [0.0] * self.numStates
+        for i in range(iterations):
+            newValues = self.computeStateValues(self.computeQValues(values, discount), values)
+            residual = max(map(abs, map(sub, newValues, values)), default=0.0)
+            values = newValues
+            if residuals != None:
+                residuals.append(residual)
+            if threshold != None and residual <= threshold:
+                break
+        return values
+
+    def gaussSeidelValueIteration(self, discount, iterations, values=None, threshold=None,
+                                  residuals=None):
+        """
+        Like valueIteration, but each sweep updates values in place, so a
+        state's backup already sees the new values of the states before it
+        in the sweep.  States are swept outward from the states with no
+        actions (see getSweepOrder), so values spread from the exits in
+        few sweeps.
+        """
+        numActions, rowSlices = self.numActions, self.rowSlices
+        nextStates, probs, rewards = self.nextStates, self.probs, self.rewards
+        stateRows = [[s * numActions + a for a in legal] for s, legal in enumerate(self.stateActions)]
+        updates = []
+        for s in self.getSweepOrder(stateRows):
+            if len(stateRows[s]) > 0:
+                entries = [rowSlices[row] for row in stateRows[s]]
+                updates.append((s, [(nextStates[e].tolist(), probs[e].tolist(), rewards[e].tolist())
+                                    for e in entries]))
+
+        values = [0.0] * self.numStates if values == None else list(values)
+        discounts = repeat(discount)
+        for i in range(iterations):
+            residual = 0.0
+            for s, rows in updates:
+                value = float('-inf')
+                for rowNextStates, rowProbs, rowRewards in rows:
+                    qValue = sum(map(mul, rowProbs,
+                                     map(add, rowRewards,
+                                         map(mul, discounts, map(values.__getitem__, rowNextStates)))))
+                    if qValue > value:
+                        value = qValue
+                if abs(value - values[s]) > residual:
+                    residual = abs(value - values[s])
+                values[s] = value
+            if residuals != None:
+                residuals.append(residual)
+            if threshold != None and residual <= threshold:
+                break
+        return values
+
+    def getSweepOrder(self, stateRows):
+        """
+        Returns every state id, ordered for in-place sweeps.  stateRows
+        lists the rows each state may take.  The order starts with the
+        states that have none, then works backwards breadth-first through
+        the states whose rows can lead to states already placed.  Any
+        states left over go last.
+        """
+        nextStates, rowSlices = self.nextStates, self.rowSlices
+        predecessors = [[] for s in range(self.numStates)]
+        for s, rows in enumerate(stateRows):
+            for row in rows:
+                for nextState in nextStates[rowSlices[row]]:
+                    if nextState != s:
+                        predecessors[nextState].append(s)
+        order = [s for s in range(self.numStates) if len(stateRows[s]) == 0]
+        placed = set(order)
+        queue = collections.deque(order)
+        while queue:
+            for predecessor in predecessors[queue.popleft()]:
+                if predecessor not in placed:
+                    placed.add(predecessor)
+                    order.append(predecessor)
+                    queue.append(predecessor)
+        order.extend(s for s in range(self.numStates) if s not in placed)
+        return order
+
+    def getExitPolicy(self):
+        """
+        Returns a policy that reaches a state with no action with
+        probability 1 from every state that can reach one at all.  Working
+        backwards breadth-first from those states, each state takes an
+        action that may lead one step closer to them.  States that cannot
+        reach them take their first legal action.
+        """
+        numActions, actions, rowSlices = self.numActions, self.actions, self.rowSlices
+        nextStates, probs = self.nextStates, self.probs
+        predecessors = [[] for s in range(self.numStates)]
+        for s, legal in enumerate(self.stateActions):
+            for a in legal:
+                entries = rowSlices[s * numActions + a]
+                for nextState, prob in zip(nextStates[entries], probs[entries]):
+                    if nextState != s and prob > 0:
+                        predecessors[nextState].append((s, actions[a]))
+        policy = [None if len(legal) == 0 else actions[legal[0]] for legal in self.stateActions]
+        placed = set(self.noActionStates)
+        queue = collections.deque(self.noActionStates)
+        while queue:
+            for predecessor, action in predecessors[queue.popleft()]:
+                if predecessor not in placed:
+                    placed.add(predecessor)
+                    policy[predecessor] = action
+                    queue.append(predecessor)
+        return policy
+
+    def extractPolicy(self, qValues, policy=None, margin=0.0):
+        """
+        Returns the best legal action for each state, or None for a state
+        with no legal actions.  Ties go to the action the MDP lists first.
+
+        Given a current policy, a state keeps its action unless another
+        action's Q-value beats it by more than margin.  This stops policy
+        iteration from cycling between actions that are only equal up to
+        rounding.
+        """
+        numActions, actions, actionIds = self.numActions, self.actions, self.actionIds
+        newPolicy = []
+        for s, legal in enumerate(self.stateActions):
+            row = s * numActions
+            bestAction, bestQValue = None, float('-inf')
+            for a in legal:
+                if qValues[row + a] > bestQValue:
+                    bestAction, bestQValue = actions[a], qValues[row + a]
+            if policy != None and policy[s] != None:
+                if bestQValue - qValues[row + actionIds[policy[s]]] <= margin:
+                    bestAction = policy[s]
+            newPolicy.append(bestAction)
+        return newPolicy
+
+    def evaluatePolicy(self, policy, discount, values=None, tolerance=1e-10, maxSweeps=None):
+        """
+        Returns the values of following policy, a list of actions indexed
+        by state id with None for states that have no action.  Those states
+        keep their entry in values, which defaults to all zero.
+
+        A policy has finite values when the discount is below 1 or when
+        every state reaches a state with no action by following it.  An MDP
+        can meet the second condition under its best policy without
+        meeting it under every policy: with discount 1, a policy that walks
+        in circles has no values at all.
+
+        Without maxSweeps, with a discount below 1 and with scipy installed,
+        this solves (I - discount * P) v = r for the policy's transitions P
+        and expected rewards r with one sparse direct solve.  Otherwise it
+        runs in-place Gauss-Seidel sweeps starting from values.  The sweeps
+        stop when no value moves by more than tolerance, after maxSweeps
+        sweeps, or as soon as a sweep moves the values at least as far as
+        the sweep before it.  Sweeps never move the values further than
+        the sweep before them, and they stop moving them less only when the
+        values drift without bound, as they do for a policy with no values.
+        Rounding can hide that drift for a while, so callers that may
+        evaluate such a policy should also pass maxSweeps.
+        """
+        if values == None:
+            values = [0.0] * self.numStates
+        numActions, actionIds, rowSlices = self.numActions, self.actionIds, self.rowSlices
+        nextStates, probs, rewards = self.nextStates, self.probs, self.rewards
+        rows = [None if action == None else s * numActions + actionIds[action]
+                for s, action in enumerate(policy)]
+
+        if maxSweeps == None and discount < 1 and scipy != None:
+            matrixRows, matrixColumns, coefficients = [], [], []
+            constants = []
+            for s, row in enumerate(rows):
+                matrixRows.append(s)
+                matrixColumns.append(s)
+                coefficients.append(1.0)
+                if row == None:
+                    constants.append(values[s])
+                    continue
+                entries = rowSlices[row]
+                for nextState, prob in zip(nextStates[entries], probs[entries]):
+                    matrixRows.append(s)
+                    matrixColumns.append(nextState)
+                    coefficients.append(-discount * prob)
+                constants.append(sum(map(mul, probs[entries], rewards[entries])))
+            matrix = scipy.sparse.csr_matrix((coefficients, (matrixRows, matrixColumns)),
+                                             shape=(self.numStates, self.numStates))
+            return scipy.sparse.linalg.spsolve(matrix.tocsc(), constants).tolist()
+
+        # Each state's update folds in its own self-transition (the
+        # Gauss-Seidel diagonal), and states are swept outward from the
+        # states with no action along the policy's transitions, so a sweep
+        # mostly reads values that were already updated in the same sweep.
+        updates = [None] * self.numStates
+        for s, row in enumerate(rows):
+            if row == None:
+                continue
+            entries = rowSlices[row]
+            selfProb, others, weights = 0.0, [], []
+            for nextState, prob in zip(nextStates[entries], probs[entries]):
+                if nextState == s:
+                    selfProb += prob
+                else:
+                    others.append(nextState)
+                    weights.append(prob)
+            if discount * selfProb >= 1.0:  # Never leaves s; its value stays put
+                continue
+            scale = 1.0 / (1.0 - discount * selfProb)
+            reward = sum(map(mul, probs[entries], rewards[entries])) * scale
+            updates[s] = (s, reward, others, [discount * scale * weight for weight in weights])
+        order = self.getSweepOrder([[] if row == None else [row] for row in rows])
+        sweepUpdates = [updates[s] for s in order if updates[s] != None]
+
+        values = list(values)
+        sweeps = 0
+        lastChange = float('inf')
+        while maxSweeps == None or sweeps < maxSweeps:
+            sweeps += 1
+            change = 0.0
+            for s, reward, others, weights in sweepUpdates:
+                value = reward + sum(map(mul, weights, map(values.__getitem__, others)))
+                if abs(value - values[s]) > change:
+                    change = abs(value - values[s])
+                values[s] = value
+            if change <= tolerance or change >= lastChange:
+                break
+            lastChange = change
+        return values
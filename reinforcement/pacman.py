@@ -43,6 +43,9 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import AgentState
+from game import Configuration
+from game import BitGrid
 from util import nearestPoint
 from util import manhattanDistance
 import util
@@ -58,6 +61,45 @@ import os
 ###################################################
 
 
+class ExplorationTracker:
+    """
+    Counts the states produced by GameState.generateSuccessor while it is
+    installed with GameState.setExplorationTracker.  Nothing is tracked by
+    default, so ordinary play pays no bookkeeping cost.
+
+    Distinct states are remembered by their hash only, so tracking never keeps
+    a state alive.  If maxStates is given, at most that many hashes are kept
+    and getNumUnique() becomes a lower bound once the limit is reached.
+    """
+
+    def __init__(self, maxStates=None):
+        self.maxStates = maxStates
+        self.reset()
+
+    def reset(self):
+        self.numGenerated = 0
+        self.uniqueHashes = set()
+        self.saturated = False
+
+    def record(self, parent, successor):
+        "Called by generateSuccessor for every successor it builds."
+        self.numGenerated += 1
+        self.add(parent)
+        self.add(successor)
+
+    def add(self, state):
+        if self.maxStates != None and len(self.uniqueHashes) >= self.maxStates:
+            self.saturated = self.saturated or hash(state) not in self.uniqueHashes
+            return
+        self.uniqueHashes.add(hash(state))
+
+    def getNumGenerated(self):
+        return self.numGenerated
+
+    def getNumUnique(self):
+        return len(self.uniqueHashes)
+
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -77,20 +119,38 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # Optional ExplorationTracker counting the states generateSuccessor builds.
+    # None (the default) turns the bookkeeping off entirely.
+    explorationTracker = None
+
+    def setExplorationTracker(tracker):
+        """
+        Installs an ExplorationTracker (or None to stop tracking) and returns
+        the previously installed one.
+        """
+        previous = GameState.explorationTracker
+        GameState.explorationTracker = tracker
+        return previous
+    setExplorationTracker = staticmethod(setExplorationTracker)
 
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
+        """
+        Returns the hashes of the distinct states generated since the last
+        call and resets the installed tracker.  Returns an empty set if no
+        tracker is installed.
+        """
+        tracker = GameState.explorationTracker
+        if tracker == None:
+            return set()
+        explored = tracker.uniqueHashes
+        tracker.reset()
+        return explored
     getAndResetExplored = staticmethod(getAndResetExplored)
 
     def getLegalActions(self, agentIndex=0):
         """
         Returns the legal actions for the agent specified.
         """
-#        GameState.explored.add(self)
         if self.isWin() or self.isLose():
             return []
 
@@ -107,9 +167,24 @@ class GameState:
         if self.isWin() or self.isLose():
             raise Exception('Can\'t generate a successor of a terminal state.')
 
-        # Copy current state
-        state = GameState(self)
+        return self.applySuccessorRules(GameState(self), agentIndex, action)
+
+    def fastGenerateSuccessor(self, agentIndex, action):
+        """
+        Returns the same successor as generateSuccessor, but shares every
+        agent state, the food grid and the capsule list the move leaves
+        untouched with this state rather than copying them.  Meant for
+        search, where states are only read: the successor must not be
+        modified through getGhostState() and the like.
+        """
+        if self.isWin() or self.isLose():
+            raise Exception('Can\'t generate a successor of a terminal state.')
+        return self.applySuccessorRules(GameState(self, True), agentIndex, action)
 
+    def applySuccessorRules(self, state, agentIndex, action):
+        """
+        Applies agentIndex's action to state, a fresh copy of this state.
+        """
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
             state.data._eaten = [False for i in range(state.getNumAgents())]
@@ -121,7 +196,7 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
         else:
-            GhostRules.decrementTimer(state.data.agentStates[agentIndex])
+            GhostRules.decrementTimer(state.data.mutableAgentState(agentIndex))
 
         # Resolve multi-agent effects
         GhostRules.checkDeath(state, agentIndex)
@@ -129,8 +204,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        state.data.deriveHash(self.data, agentIndex)
+        if GameState.explorationTracker != None:
+            GameState.explorationTracker.record(self, state)
         return state
 
     def getLegalPacmanActions(self):
@@ -226,12 +302,12 @@ class GameState:
     # You shouldn't need to call these directly #
     #############################################
 
-    def __init__(self, prevState=None):
+    def __init__(self, prevState=None, shareStructure=False):
         """
         Generates a new state by copying information from its predecessor.
         """
         if prevState != None:  # Initial state
-            self.data = GameStateData(prevState.data)
+            self.data = GameStateData(prevState.data, shareStructure)
         else:
             self.data = GameStateData()
 
@@ -262,6 +338,45 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+    def pack(self):
+        """
+        Returns a compact, picklable description of this state for shipping to
+        another process: the food bits, capsules, score, outcome and each
+        agent's start, configuration and timers.  The layout is left out;
+        GameState.unpack rebuilds the state given the same layout.
+        """
+        data = self.data
+        agents = tuple((agentState.start.pos, agentState.start.direction,
+                        agentState.configuration.pos, agentState.configuration.direction,
+                        agentState.isPacman, agentState.scaredTimer,
+                        agentState.numCarrying, agentState.numReturned)
+                       for agentState in data.agentStates)
+        return (data.food.bits, tuple(data.capsules), data.score,
+                data._win, data._lose, tuple(data._eaten), agents)
+
+    def unpack(packed, layout):
+        "Rebuilds a GameState packed by GameState.pack on the given layout."
+        foodBits, capsules, score, win, lose, eaten, agents = packed
+        state = GameState()
+        data = state.data
+        data.layout = layout
+        data.food = BitGrid.fromBits(layout.width, layout.height, foodBits)
+        data.capsules = list(capsules)
+        data.score = score
+        data._win = win
+        data._lose = lose
+        data._eaten = list(eaten)
+        data.agentStates = []
+        for startPos, startDirection, pos, direction, isPacman, scaredTimer, numCarrying, numReturned in agents:
+            agentState = AgentState(Configuration(startPos, startDirection), isPacman)
+            agentState.configuration = Configuration(pos, direction)
+            agentState.scaredTimer = scaredTimer
+            agentState.numCarrying = numCarrying
+            agentState.numReturned = numReturned
+            data.agentStates.append(agentState)
+        return state
+    unpack = staticmethod(unpack)
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -291,6 +406,10 @@ class ClassicGameRules:
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
+        if GameState.explorationTracker != None:
+            # Give each game its own counters
+            GameState.explorationTracker = ExplorationTracker(GameState.explorationTracker.maxStates)
+        game.explorationTracker = GameState.explorationTracker
         return game
 
     def process(self, state, game):
@@ -359,7 +478,7 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.mutableAgentState(0)
 
         # Update Configuration
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
@@ -389,11 +508,11 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if(position in state.getCapsules()):
-            state.data.capsules.remove(position)
+            state.data.mutableCapsules().remove(position)
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.mutableAgentState(index).scaredTimer = SCARED_TIME
     consume = staticmethod(consume)
 
 
@@ -425,7 +544,7 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.mutableAgentState(ghostIndex)
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0:
             speed /= 2.0
@@ -449,12 +568,12 @@ class GhostRules:
                 ghostState = state.data.agentStates[index]
                 ghostPosition = ghostState.configuration.getPosition()
                 if GhostRules.canKill(pacmanPosition, ghostPosition):
-                    GhostRules.collide(state, ghostState, index)
+                    GhostRules.collide(state, state.data.mutableAgentState(index), index)
         else:
             ghostState = state.data.agentStates[agentIndex]
             ghostPosition = ghostState.configuration.getPosition()
             if GhostRules.canKill(pacmanPosition, ghostPosition):
-                GhostRules.collide(state, ghostState, agentIndex)
+                GhostRules.collide(state, state.data.mutableAgentState(agentIndex), agentIndex)
     checkDeath = staticmethod(checkDeath)
 
     def collide(state, ghostState, agentIndex):
@@ -17,6 +17,93 @@ from learningAgents import ReinforcementAgent
 from featureExtractors import *
 
 import random,util,math
+import array
+
+class QTable:
+    """
+      Q-values in one flat array of doubles, with a row per state and a
+      column per action.  A state gets a row (and its actions columns) the
+      first time it is looked up, and the legal actions actionFn gives for
+      it are cached with the row.  After that, the max and argmax over a
+      state's legal actions are plain index reads.  Entries that were
+      never written hold 0.0.
+
+      Rows with the same legal actions share one (actions, columns) pair
+      in legalSets, so a row costs a dictionary slot plus 8 bytes per
+      column.  A Counter keyed by (state, action) tuples spends a tuple, a
+      float and a dictionary slot on every entry.  Legal actions must
+      depend only on the state.
+    """
+    def __init__(self, actionFn, actions=()):
+        self.actionFn = actionFn
+        self.stateIds = {}
+        self.actionIds = {}
+        self.actions = []
+        self.legalSetIds = {}
+        self.legalSets = []  # Distinct (legal actions, their columns) pairs
+        self.rowSets = array.array('l')  # Per row: its index in legalSets
+        self.values = array.array('d')
+        for action in actions:
+            self.getColumn(action)
+
+    def __len__(self):
+        return len(self.rowSets)
+
+    def __contains__(self, state):
+        return state in self.stateIds
+
+    def getRow(self, state):
+        row = self.stateIds.get(state)
+        if row == None:
+            legalActions = tuple(self.actionFn(state))
+            legalSet = self.legalSetIds.get(legalActions)
+            if legalSet == None:
+                legalColumns = tuple([self.getColumn(action) for action in legalActions])
+                legalSet = self.legalSetIds[legalActions] = len(self.legalSets)
+                self.legalSets.append((legalActions, legalColumns))
+            row = self.stateIds[state] = len(self.rowSets)
+            self.rowSets.append(legalSet)
+            self.values.extend(array.array('d', [0.0]) * len(self.actions))
+        return row
+
+    def getColumn(self, action):
+        column = self.actionIds.get(action)
+        if column == None:
+            # A new action widens every row; this only happens the first
+            # few times each action is seen.
+            numColumns = len(self.actions)
+            column = self.actionIds[action] = numColumns
+            self.actions.append(action)
+            values = array.array('d', [0.0]) * (len(self.rowSets) * (numColumns + 1))
+            for row in range(len(self.rowSets)):
+                start = row * (numColumns + 1)
+                values[start:start + numColumns] = self.values[row * numColumns:(row + 1) * numColumns]
+            self.values = values
+        return column
+
+    def getQValue(self, state, action):
+        row, column = self.stateIds.get(state), self.actionIds.get(action)
+        if row == None or column == None:
+            return 0.0
+        return self.values[row * len(self.actions) + column]
+
+    def setQValue(self, state, action, value):
+        row = self.getRow(state)
+        column = self.getColumn(action)
+        self.values[row * len(self.actions) + column] = value
+
+    def getLegalActions(self, state):
+        return self.legalSets[self.rowSets[self.getRow(state)]][0]
+
+    def getLegalQValues(self, state):
+        """
+          Returns the state's legal actions and their Q-values, in the
+          order actionFn lists them.
+        """
+        row = self.getRow(state)
+        legalActions, legalColumns = self.legalSets[self.rowSets[row]]
+        start = row * len(self.actions)
+        return legalActions, list(map(self.values.__getitem__, map(start.__add__, legalColumns)))
 
 class QLearningAgent(ReinforcementAgent):
     """
@@ -43,7 +130,7 @@ class QLearningAgent(ReinforcementAgent):
         ReinforcementAgent.__init__(self, **args)
 
         "*** YOUR CODE HERE ***"
-        self.QValues = util.Counter()
+        self.qTable = QTable(self.actionFn)
 
     def getQValue(self, state, action):
         """
@@ -52,7 +139,17 @@ class QLearningAgent(ReinforcementAgent):
           or the Q node value otherwise
         """
         "*** YOUR CODE HERE ***"
-        return self.QValues[(state, action)]
+        return self.qTable.getQValue(state, action)
+
+    def getLegalQValues(self, state):
+        """
+          Returns the legal actions in state and their Q-values, read off
+          the Q-table in one lookup.
+        """
+        return self.qTable.getLegalQValues(state)
+
+    def seenState(self, state):
+        return state in self.qTable
 
 
     def computeValueFromQValues(self, state):
@@ -63,9 +160,10 @@ class QLearningAgent(ReinforcementAgent):
           terminal state, you should return a value of 0.0.
         """
         "*** YOUR CODE HERE ***"
-        if len(self.getLegalActions(state))==0:
+        actions, qValues = self.getLegalQValues(state)
+        if len(actions)==0:
             return 0.0
-        return max([self.getQValue(state,action) for action in self.getLegalActions(state)])
+        return max(qValues)
 
     def computeActionFromQValues(self, state):
         """
@@ -76,9 +174,9 @@ class QLearningAgent(ReinforcementAgent):
         "*** YOUR CODE HERE ***"
         bestAction = None
         maxQValue = -float('inf')
-        for action in self.getLegalActions(state):
-            if self.getQValue(state,action) > maxQValue:
-                maxQValue = self.getQValue(state, action)
+        for action, qValue in zip(*self.getLegalQValues(state)):
+            if qValue > maxQValue:
+                maxQValue = qValue
                 bestAction = action
         return bestAction
 
@@ -113,8 +211,39 @@ class QLearningAgent(ReinforcementAgent):
           it will be called on your behalf
         """
         "*** YOUR CODE HERE ***"
-        self.QValues[(state,action)] = (1-self.alpha) * self.getQValue(state,action) + \
-          self.alpha * (reward + self.discount * self.computeValueFromQValues(nextState))
+        self.qTable.setQValue(state, action, (1-self.alpha) * self.getQValue(state,action) + \
+          self.alpha * (reward + self.discount * self.computeValueFromQValues(nextState)))
+
+    def updateBatch(self, states, actions, nextStates, rewards):
+        """
+          Applies many transitions, in order, with the same result as
+          calling update on each.  Every state and action is looked up in
+          the Q-table once up front, so the update loop itself only does
+          array arithmetic.  Subclasses that override update (such as
+          ApproximateQAgent) get the plain loop that calls it instead.
+        """
+        if type(self).update is not QLearningAgent.update:
+            ReinforcementAgent.updateBatch(self, states, actions, nextStates, rewards)
+            return
+        qTable = self.qTable
+        rows = [qTable.getRow(state) for state in states]
+        columns = [qTable.getColumn(action) for action in actions]
+        nextRows = [qTable.getRow(nextState) for nextState in nextStates]
+        # A new action widens every row, so read the table's layout only
+        # after every lookup is done
+        values, numColumns = qTable.values, len(qTable.actions)
+        legalSets, rowSets = qTable.legalSets, qTable.rowSets
+        entries = [row * numColumns + column for row, column in zip(rows, columns)]
+        nextStarts = [row * numColumns for row in nextRows]
+        nextColumns = [legalSets[rowSets[row]][1] for row in nextRows]
+        getValue = values.__getitem__
+        alpha, discount = self.alpha, self.discount
+        for entry, nextStart, nextLegalColumns, reward in zip(entries, nextStarts, nextColumns, rewards):
+            if nextLegalColumns:
+                nextValue = max(map(getValue, map(nextStart.__add__, nextLegalColumns)))
+            else:
+                nextValue = 0.0
+            values[entry] = (1-alpha) * values[entry] + alpha * (reward + discount * nextValue)
 
     def getPolicy(self, state):
         return self.computeActionFromQValues(state)
@@ -179,6 +308,10 @@ class ApproximateQAgent(PacmanQAgent):
         "*** YOUR CODE HERE ***"
         return self.getWeights()*self.featExtractor.getFeatures(state, action)
 
+    def getLegalQValues(self, state):
+        actions = self.getLegalActions(state)
+        return actions, [self.getQValue(state, action) for action in actions]
+
     def update(self, state, action, nextState, reward):
         """
            Should update your weights based on transition
@@ -27,10 +27,18 @@
 
 
 import mdp, util
+from mdp import CompiledMDP
+from operator import sub
 
 from learningAgents import ValueEstimationAgent
 import collections
 
+# The default tolerance of the policy iteration agents
+POLICY_TOLERANCE = 1e-8
+
+# The most Gauss-Seidel sweeps one policy evaluation may run
+MAX_EVALUATION_SWEEPS = 10000
+
 class ValueIterationAgent(ValueEstimationAgent):
     """
         * Please read learningAgents.py before reading this.*
@@ -39,8 +47,13 @@ class ValueIterationAgent(ValueEstimationAgent):
         (see mdp.py) on initialization and runs value iteration
         for a given number of iterations using the supplied
         discount factor.
+
+        Given a tolerance, it stops early once the Bellman residual (the
+        largest change a sweep makes) shows every value is within
+        tolerance of optimal.  residuals records each sweep's residual
+        and sweeps how many sweeps ran.
     """
-    def __init__(self, mdp, discount = 0.9, iterations = 100):
+    def __init__(self, mdp, discount = 0.9, iterations = 100, tolerance = None):
         """
           Your value iteration agent should take an mdp on
           construction, run the indicated number of iterations
@@ -56,20 +69,44 @@ class ValueIterationAgent(ValueEstimationAgent):
         self.mdp = mdp
         self.discount = discount
         self.iterations = iterations
+        self.tolerance = tolerance
         self.values = util.Counter() # A Counter is a dict with default 0
+        self.residuals = []
         self.runValueIteration()
+        self.sweeps = len(self.residuals)
+
+    def getResidualThreshold(self):
+        """
+          Returns the Bellman residual at or below which every value is
+          within self.tolerance of optimal, or None with no tolerance.
+          A residual r bounds the error by r * discount / (1 - discount).
+        """
+        if self.tolerance == None:
+            return None
+        if self.discount <= 0:
+            return float('inf')
+        return self.tolerance * (1 - self.discount) / self.discount
 
     def runValueIteration(self):
         # Write value iteration code here
         "*** YOUR CODE HERE ***"
-        for _ in range(self.iterations):
-            QValue = dict()
-            states = self.mdp.getStates()
-            for state in states:
-                QValue[state] = self.computeQValueFromValues(state,
-                                                             self.computeActionFromValues(state))
+        threshold = self.getResidualThreshold()
+        states = self.mdp.getStates()
+        while len(self.residuals) < self.iterations:
+            # One pass per state: its value is its largest Q-value
+            newValues = dict()
             for state in states:
-                self.values[state] = QValue[state]
+                actions = self.mdp.getPossibleActions(state)
+                if len(actions) == 0:
+                    newValues[state] = self.values[state]
+                else:
+                    newValues[state] = max([self.computeQValueFromValues(state, action)
+                                            for action in actions])
+            residual = max([abs(newValues[state] - self.values[state]) for state in states] + [0.0])
+            self.values.update(newValues)
+            self.residuals.append(residual)
+            if threshold != None and residual <= threshold:
+                break
 
 
     def getValue(self, state):
@@ -127,6 +164,147 @@ class ValueIterationAgent(ValueEstimationAgent):
         return self.computeQValueFromValues(state, action)
 
 
+class CompiledValueIterationAgent(ValueIterationAgent):
+    """
+        A ValueIterationAgent that compiles its MDP into a CompiledMDP
+        (see mdp.py) once and runs its sweeps over the compiled arrays.  It
+        gives the same values, Q-values and policy as ValueIterationAgent
+        without calling the MDP again after compiling it.
+    """
+    def runValueIteration(self):
+        compiled = self.compiled = CompiledMDP(self.mdp)
+        values = compiled.valueIteration(self.discount, self.iterations,
+                                         threshold=self.getResidualThreshold(),
+                                         residuals=self.residuals)
+        self.values.update(zip(compiled.states, values))
+        self.qValues = compiled.computeQValues(values, self.discount)
+        self.policy = compiled.extractPolicy(self.qValues)
+
+    def computeQValueFromValues(self, state, action):
+        if action == None:
+            return self.values[state]
+        return self.qValues[self.compiled.getRow(state, action)]
+
+    def computeActionFromValues(self, state):
+        return self.policy[self.compiled.stateIds[state]]
+
+
+class GaussSeidelValueIterationAgent(CompiledValueIterationAgent):
+    """
+        A GaussSeidelValueIterationAgent runs value iteration in place:
+        each state's new value is used by the states after it in the same
+        sweep (see CompiledMDP.gaussSeidelValueIteration).  This usually
+        takes far fewer sweeps than ValueIterationAgent to reach the same
+        tolerance, but the values after a fixed number of sweeps differ.
+    """
+    def runValueIteration(self):
+        compiled = self.compiled = CompiledMDP(self.mdp)
+        values = compiled.gaussSeidelValueIteration(self.discount, self.iterations,
+                                                    threshold=self.getResidualThreshold(),
+                                                    residuals=self.residuals)
+        self.values.update(zip(compiled.states, values))
+        self.qValues = compiled.computeQValues(values, self.discount)
+        self.policy = compiled.extractPolicy(self.qValues)
+
+
+class PolicyIterationAgent(CompiledValueIterationAgent):
+    """
+        A PolicyIterationAgent takes a Markov decision process (see mdp.py)
+        on initialization and runs policy iteration: it evaluates its
+        policy exactly, makes the policy greedy with respect to those
+        values, and repeats until no state's action changes.  Here
+        iterations only caps the number of improvement steps.
+
+        Evaluation is a sparse linear solve when scipy is installed and
+        Gauss-Seidel sweeps otherwise (see CompiledMDP.evaluatePolicy),
+        run until the values are within tolerance of the policy's own, as
+        tolerance means for ValueIterationAgent.  policyIterations records
+        how many improvement steps ran.
+
+        Without discounting, a policy that never reaches an exit has no
+        values, so the first policy is one that reaches an exit from every
+        state that can (see CompiledMDP.getExitPolicy); improving such a
+        policy keeps it that way.  Each evaluation also stops after
+        MAX_EVALUATION_SWEEPS sweeps, for states that cannot reach an exit
+        under any policy.
+    """
+    def __init__(self, mdp, discount = 0.9, iterations = 100, tolerance = POLICY_TOLERANCE):
+        ValueIterationAgent.__init__(self, mdp, discount, iterations, tolerance)
+
+    def getEvaluationTolerance(self):
+        """
+          Returns the sweep-to-sweep change at which a policy evaluation is
+          within self.tolerance of the policy's values (see
+          getResidualThreshold).  An undiscounted MDP has no such bound, so
+          the change itself is held to self.tolerance.
+        """
+        threshold = self.getResidualThreshold()
+        if threshold == 0:
+            return self.tolerance
+        return threshold
+
+    def runValueIteration(self):
+        compiled = self.compiled = CompiledMDP(self.mdp)
+        values = [0.0] * compiled.numStates
+        self.qValues = compiled.computeQValues(values, self.discount)
+        evaluationTolerance = self.getEvaluationTolerance()
+        if self.discount < 1:
+            policy = compiled.extractPolicy(self.qValues)
+            maxSweeps = None
+        else:
+            policy = compiled.getExitPolicy()
+            maxSweeps = MAX_EVALUATION_SWEEPS
+        self.policyIterations = 0
+        while self.policyIterations < self.iterations:
+            self.policyIterations += 1
+            values = compiled.evaluatePolicy(policy, self.discount, values,
+                                             evaluationTolerance, maxSweeps)
+            self.qValues = compiled.computeQValues(values, self.discount)
+            newPolicy = compiled.extractPolicy(self.qValues, policy, self.tolerance)
+            stable = newPolicy == policy
+            policy = newPolicy
+            if stable:
+                break
+        self.policy = policy
+        self.values.update(zip(compiled.states, values))
+
+
+class ModifiedPolicyIterationAgent(PolicyIterationAgent):
+    """
+        A ModifiedPolicyIterationAgent evaluates each greedy policy only
+        partly, with evaluationSweeps Gauss-Seidel sweeps, before improving
+        it again.  Like ValueIterationAgent, it stops once a Bellman backup's
+        residual shows every value is within tolerance of optimal, or after
+        iterations improvement steps.
+    """
+    def __init__(self, mdp, discount = 0.9, iterations = 100, tolerance = POLICY_TOLERANCE, evaluationSweeps = 5):
+        self.evaluationSweeps = evaluationSweeps
+        PolicyIterationAgent.__init__(self, mdp, discount, iterations, tolerance)
+
+    def runValueIteration(self):
+        compiled = self.compiled = CompiledMDP(self.mdp)
+        values = [0.0] * compiled.numStates
+        policy = None
+        threshold = self.getResidualThreshold()
+        evaluationTolerance = self.getEvaluationTolerance()
+        self.policyIterations = 0
+        while self.policyIterations < self.iterations:
+            self.policyIterations += 1
+            qValues = compiled.computeQValues(values, self.discount)
+            policy = compiled.extractPolicy(qValues, policy)
+            newValues = compiled.computeStateValues(qValues, values)
+            residual = max(map(abs, map(sub, newValues, values)))
+            self.residuals.append(residual)
+            if residual <= threshold:
+                values = newValues
+                break
+            values = compiled.evaluatePolicy(policy, self.discount, newValues, evaluationTolerance,
+                                             self.evaluationSweeps)
+        self.qValues = compiled.computeQValues(values, self.discount)
+        self.policy = compiled.extractPolicy(self.qValues, policy, self.tolerance)
+        self.values.update(zip(compiled.states, values))
+
+
 class PrioritizedSweepingValueIterationAgent(ValueIterationAgent):
     """
         * Please read learningAgents.py before reading this.*
@@ -153,7 +331,7 @@ class PrioritizedSweepingValueIterationAgent(ValueIterationAgent):
                 for successor, _ in self.mdp.getTransitionStatesAndProbs(state,action):
                     predecessors[successor].add(state)
         
-        priorityQueue = util.PriorityQueue()
+        priorityQueue = util.IndexedPriorityQueue()
         for s in states:
             if self.mdp.isTerminal(s):
                 continue
@@ -14,6 +14,9 @@
 
 import search
 import random
+import bisect
+import mmap
+import os
 
 # Module Classes
 
@@ -196,7 +199,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -262,6 +265,362 @@ def createRandomEightPuzzle(moves=100):
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+class SlidingPuzzleSearchProblem(search.SearchProblem):
+    """
+      A SearchProblem for the N x N sliding puzzle (the eight puzzle is
+    N = 3, the fifteen puzzle N = 4) with packed states.
+
+    A state is a pair (tiles, blank) of integers: tiles holds the number on
+    cell i (cells numbered row by row, the blank as 0) in bits
+    [i * bitsPerCell, (i + 1) * bitsPerCell), and blank is the blank's cell.
+    Moving a tile is two xors.  Moves are named for the way the blank goes,
+    as in EightPuzzleState, and the goal has the blank in the top left and
+    the tiles in order after it.
+    """
+    def __init__(self, numbers):
+        "numbers: the tiles row by row, 0 for the blank, as for EightPuzzleState."
+        self.size = int(round(len(numbers) ** 0.5))
+        self.numCells = self.size * self.size
+        if sorted(numbers) != list(range(self.numCells)):
+            raise Exception('Not a sliding puzzle: ' + str(numbers))
+        # Every move swaps the blank with a tile and moves the blank one
+        # cell, so the parity of the permutation of the cells and of the
+        # blank's distance from its goal cell (cell 0) change together
+        inversions = 0
+        for i in range(self.numCells):
+            for j in range(i + 1, self.numCells):
+                if numbers[i] > numbers[j]:
+                    inversions += 1
+        blankRow, blankCol = divmod(numbers.index(0), self.size)
+        if (inversions + blankRow + blankCol) % 2 != 0:
+            raise Exception('Unsolvable sliding puzzle: ' + str(numbers))
+        self.bitsPerCell = (self.numCells - 1).bit_length()
+        self.start = (self.packTiles(numbers), numbers.index(0))
+        self.goalTiles = self.packTiles(list(range(self.numCells)))
+        # moves[cell] lists (move, cell the blank moves to), in legalMoves order
+        self.moves = []
+        for cell in range(self.numCells):
+            row, col = divmod(cell, self.size)
+            cellMoves = []
+            if row != 0: cellMoves.append(('up', cell - self.size))
+            if row != self.size - 1: cellMoves.append(('down', cell + self.size))
+            if col != 0: cellMoves.append(('left', cell - 1))
+            if col != self.size - 1: cellMoves.append(('right', cell + 1))
+            self.moves.append(cellMoves)
+        self.heuristicInfo = {}
+        self._expanded = 0
+
+    def packTiles(self, numbers):
+        tiles = 0
+        for cell, number in enumerate(numbers):
+            tiles |= number << (cell * self.bitsPerCell)
+        return tiles
+
+    def unpackTiles(self, tiles):
+        "Returns the numbers on the cells of a packed tiles integer."
+        mask = (1 << self.bitsPerCell) - 1
+        return [(tiles >> (cell * self.bitsPerCell)) & mask for cell in range(self.numCells)]
+
+    def getStartState(self):
+        return self.start
+
+    def isGoalState(self, state):
+        return state[0] == self.goalTiles
+
+    def getSuccessors(self, state):
+        """
+          Returns list of (successor, action, stepCost) pairs for the blank
+        moving up, down, left or right, each at cost 1.
+        """
+        self._expanded += 1
+        tiles, blank = state
+        bits = self.bitsPerCell
+        mask = (1 << bits) - 1
+        successors = []
+        for move, cell in self.moves[blank]:
+            number = (tiles >> (cell * bits)) & mask
+            successors.append(((tiles ^ (number << (cell * bits)) ^ (number << (blank * bits)), cell), move, 1))
+        return successors
+
+    def getCostOfActions(self, actions):
+        return len(actions)
+
+def createRandomSlidingPuzzle(size=4, moves=100):
+    """
+      Returns the numbers of a random size x size sliding puzzle, made by
+    applying 'moves' random moves to a solved one.
+    """
+    problem = SlidingPuzzleSearchProblem(list(range(size * size)))
+    state = problem.getStartState()
+    for i in range(moves):
+        state = random.choice(problem.getSuccessors(state))[0]
+    return problem.unpackTiles(state[0])
+
+class PatternDatabase:
+    """
+    An additive pattern database for the sliding puzzle: for every placement
+    of a set of pattern tiles and region of other cells the blank is in,
+    the fewest moves of pattern tiles that bring them home, not counting
+    the other tiles' moves.  Disjoint patterns' values can therefore be
+    added and still never overestimate.
+
+    Entries are indexed as region + numCells * (the sum of
+    position(tiles[j]) * numCells ** j), where a region is named by its
+    lowest cell, and the values (one byte each, 255 where the goal cannot
+    be reached) are stored in a bytearray, or in a read-only memory map
+    when loaded from disk.
+    """
+    def __init__(self, size, tiles, distances):
+        self.size = size
+        self.tiles = tuple(tiles)
+        self.distances = distances
+        self.numCells = numCells = size * size
+        self.weights = [numCells ** (j + 1) for j in range(len(tiles))]
+        self.neighbors = []
+        for cell in range(numCells):
+            row, col = divmod(cell, size)
+            self.neighbors.append([cell + d for d, ok in [(-size, row > 0), (size, row < size - 1),
+                                                          (-1, col > 0), (1, col < size - 1)] if ok])
+        self.regionCache = {}
+
+    def getRegions(self, occupied):
+        """
+        For a bitmask of pattern cells, returns the lowest cell of the blank
+        region around each free cell (None for pattern cells) and a dict
+        from each region's lowest cell to its cells.
+        """
+        if occupied not in self.regionCache:
+            neighbors = self.neighbors
+            lowest = [None] * self.numCells
+            regionCells = {}
+            for cell in range(self.numCells):
+                if occupied >> cell & 1 or lowest[cell] != None:
+                    continue
+                region, frontier = [cell], [cell]
+                lowest[cell] = cell
+                while frontier:
+                    nextFrontier = []
+                    for current in frontier:
+                        for neighbor in neighbors[current]:
+                            if not occupied >> neighbor & 1 and lowest[neighbor] == None:
+                                lowest[neighbor] = cell
+                                region.append(neighbor)
+                                nextFrontier.append(neighbor)
+                    frontier = nextFrontier
+                regionCells[cell] = region
+            self.regionCache[occupied] = (lowest, regionCells)
+        return self.regionCache[occupied]
+
+    def build(size, tiles):
+        """
+        Fills the database with one breadth-first search back from the goal.
+        A search state is a placement of the pattern tiles and the blank's
+        region (it moves through those cells for free); a pattern tile next
+        to the region can slide into it, leaving the blank where the tile
+        was.
+        """
+        database = PatternDatabase(size, tiles, None)
+        numCells, weights, neighbors = database.numCells, database.weights, database.neighbors
+        distances = bytearray(b'\xff') * (numCells ** (len(tiles) + 1))
+        occupied = sum([1 << tile for tile in tiles])
+        start = sum([tile * weight for tile, weight in zip(tiles, weights)])
+        start += database.getRegions(occupied)[0][0]  # The goal blank is in cell 0
+        distances[start] = 0
+        frontier = [start]
+        depth = 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for index in frontier:
+                rest, region = divmod(index, numCells)
+                positions = []
+                for j in range(len(tiles)):
+                    rest, position = divmod(rest, numCells)
+                    positions.append(position)
+                occupied = 0
+                for position in positions:
+                    occupied |= 1 << position
+                blankCells = database.getRegions(occupied)[1][region]
+                placement = index - region
+                for position, weight in zip(positions, weights):
+                    for cell in neighbors[position]:
+                        if cell in blankCells:
+                            nextOccupied = occupied ^ (1 << position) ^ (1 << cell)
+                            nextIndex = (placement + (cell - position) * weight +
+                                         database.getRegions(nextOccupied)[0][position])
+                            if distances[nextIndex] == 255:
+                                distances[nextIndex] = depth
+                                nextFrontier.append(nextIndex)
+            frontier = nextFrontier
+        database.distances = distances
+        return database
+    build = staticmethod(build)
+
+    def getFileName(self):
+        return 'puzzle%d-%s-regions.pdb' % (self.size, '-'.join([str(tile) for tile in self.tiles]))
+
+    def save(self, path):
+        f = open(path, 'wb')
+        try:
+            f.write(self.distances)
+        finally:
+            f.close()
+
+    def load(path, size, tiles):
+        "Maps a saved database into memory read-only; pages are read as they are used."
+        f = open(path, 'rb')
+        try:
+            distances = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        return PatternDatabase(size, tiles, distances)
+    load = staticmethod(load)
+
+    def getValue(self, positions):
+        "positions[t] is the cell of tile t, and positions[0] the blank's."
+        index = 0
+        occupied = 0
+        for tile, weight in zip(self.tiles, self.weights):
+            index += positions[tile] * weight
+            occupied |= 1 << positions[tile]
+        return self.distances[index + self.getRegions(occupied)[0][positions[0]]]
+
+# Disjoint patterns partitioning the tiles of each puzzle size; other sizes
+# get theirs from getDefaultPatterns
+DEFAULT_PATTERNS = {3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+                    4: [(1, 2, 3, 4, 5), (6, 7, 8, 9, 10), (11, 12, 13, 14, 15)]}
+# The most entries (numCells ** (tiles + 1), one byte each) a generated
+# pattern's database may have
+MAX_PATTERN_STATES = 1 << 24
+PATTERN_DATABASE_CACHE = {}
+# Directory where patternDatabaseHeuristic keeps its databases between
+# runs (the fifteen puzzle's take about 25 seconds to build); None keeps
+# them in memory only
+PATTERN_DATABASE_DIR = None
+
+def getDefaultPatterns(size):
+    """
+    Returns DEFAULT_PATTERNS[size], or for other sizes the tiles cut in
+    order into disjoint patterns as large as MAX_PATTERN_STATES allows (four
+    tiles for the 5x5 puzzle).  Returns no patterns where they would hold
+    fewer than two tiles: a one-tile database is just Manhattan distance.
+    """
+    if size in DEFAULT_PATTERNS:
+        return DEFAULT_PATTERNS[size]
+    numCells = size * size
+    tilesPerPattern = 0
+    while numCells ** (tilesPerPattern + 2) <= MAX_PATTERN_STATES:
+        tilesPerPattern += 1
+    if tilesPerPattern < 2:
+        return []
+    tiles = list(range(1, numCells))
+    return [tuple(tiles[i:i + tilesPerPattern]) for i in range(0, len(tiles), tilesPerPattern)]
+
+def getPatternDatabases(size, patterns=None, cacheDir=None):
+    """
+    Returns a PatternDatabase for each pattern (getDefaultPatterns(size) by
+    default), built once per process.  With cacheDir, databases are loaded
+    from files there, or built and saved there the first time.
+    """
+    databases = []
+    for tiles in patterns or getDefaultPatterns(size):
+        key = (size, tuple(tiles))
+        if key not in PATTERN_DATABASE_CACHE:
+            database = None
+            if cacheDir != None:
+                path = os.path.join(cacheDir, PatternDatabase(size, tiles, None).getFileName())
+                if os.path.exists(path):
+                    database = PatternDatabase.load(path, size, tiles)
+            if database == None:
+                database = PatternDatabase.build(size, tiles)
+                if cacheDir != None:
+                    database.save(path)
+            PATTERN_DATABASE_CACHE[key] = database
+        databases.append(PATTERN_DATABASE_CACHE[key])
+    return databases
+
+def getTilePositions(state, problem):
+    "Returns a list whose entry t is the cell of tile t in a packed state."
+    tiles = state[0]
+    bits = problem.bitsPerCell
+    mask = (1 << bits) - 1
+    positions = [0] * problem.numCells
+    for cell in range(problem.numCells):
+        positions[(tiles >> (cell * bits)) & mask] = cell
+    return positions
+
+def countTileDistance(positions, size):
+    "The sum of the Manhattan distances of the tiles from their goal cells."
+    total = 0
+    for tile in range(1, len(positions)):
+        cell = positions[tile]
+        total += abs(cell // size - tile // size) + abs(cell % size - tile % size)
+    return total
+
+def countLineConflicts(goalOrder):
+    """
+    The fewest tiles to take out of a line so the rest are in goal order.
+    Each must leave the line and come back, two moves Manhattan distance
+    does not count.
+    """
+    increasing = []
+    for value in goalOrder:
+        i = bisect.bisect_left(increasing, value)
+        increasing[i:i + 1] = [value]
+    return len(goalOrder) - len(increasing)
+
+def countConflicts(positions, size):
+    "countLineConflicts summed over every row and column."
+    # Tiles already in their goal row (column), as (column, goal column) pairs
+    rows = [[] for i in range(size)]
+    cols = [[] for i in range(size)]
+    for tile in range(1, len(positions)):
+        cell = positions[tile]
+        if cell // size == tile // size:
+            rows[cell // size].append((cell % size, tile % size))
+        if cell % size == tile % size:
+            cols[cell % size].append((cell // size, tile // size))
+    conflicts = 0
+    for line in rows + cols:
+        line.sort()
+        conflicts += countLineConflicts([goal for current, goal in line])
+    return conflicts
+
+def slidingManhattanHeuristic(state, problem):
+    "The Manhattan distance heuristic for a SlidingPuzzleSearchProblem."
+    return countTileDistance(getTilePositions(state, problem), problem.size)
+
+def linearConflictHeuristic(state, problem):
+    """
+    Manhattan distance plus two moves for every tile that must get out of
+    the way of another tile in its goal row or column.  A move changes the
+    Manhattan distance by one and the conflicts of at most one line by one
+    (in the direction that keeps the total from dropping by more than one),
+    so this is consistent.
+    """
+    positions = getTilePositions(state, problem)
+    return countTileDistance(positions, problem.size) + 2 * countConflicts(positions, problem.size)
+
+def patternDatabaseHeuristic(state, problem):
+    """
+    The sum of the default additive pattern databases for the puzzle's
+    size (see getDefaultPatterns), or the linear-conflict bound where that
+    is larger, as it always is for puzzles too big for any databases.  A
+    move of a pattern's tile changes that pattern's entry by at most one,
+    and leaves the blank in the same region for every other pattern, whose
+    entries stay put.  So the sum is consistent, and so is its maximum
+    with the (consistent) linear-conflict bound.
+    """
+    info = problem.heuristicInfo
+    if 'patternDatabases' not in info:
+        info['patternDatabases'] = getPatternDatabases(problem.size, cacheDir=PATTERN_DATABASE_DIR)
+    positions = getTilePositions(state, problem)
+    total = 0
+    for database in info['patternDatabases']:
+        total += database.getValue(positions)
+    size = problem.size
+    return max(total, countTileDistance(positions, size) + 2 * countConflicts(positions, size))
+
 if __name__ == '__main__':
     puzzle = createRandomEightPuzzle(25)
     print('A random puzzle:')
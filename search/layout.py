@@ -14,11 +14,18 @@
 
 from util import manhattanDistance
 from game import Grid
+from game import BitGrid
+from game import Actions
+import array
+import heapq
+import hashlib
 import os
+import pickle
 import random
 from functools import reduce
 
 VISIBILITY_MATRIX_CACHE = {}
+MAZE_DISTANCE_CACHE = {}
 
 class Layout:
     """
@@ -29,13 +36,14 @@ class Layout:
         self.width = len(layoutText[0])
         self.height= len(layoutText)
         self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
+        self.food = BitGrid(self.width, self.height, False)
         self.capsules = []
         self.agentPositions = []
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
         self.totalFood = len(self.food.asList())
+        self._mazeDistances = None  # Filled in by getMazeDistances
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -87,11 +95,66 @@ class Layout:
         row, col = [int(x) for x in pacPos]
         return ghostPos in self.visibility[row][col][pacDirection]
 
+    def getMazeDistances(self, cacheDir=None):
+        """
+        Returns the MazeDistances index for this layout's walls.  It is built
+        once per wall signature and shared by every layout with the same
+        walls.  Given a cacheDir, the index is also loaded from or saved to
+        a file there named after the signature.  The walls are only hashed
+        the first time; after that the layout keeps its own reference.
+        """
+        if self._mazeDistances != None:
+            return self._mazeDistances
+        signature = MazeDistances.wallSignature(self.walls)
+        if signature not in MAZE_DISTANCE_CACHE:
+            distances = None
+            if cacheDir != None:
+                path = os.path.join(cacheDir, signature + '.dist')
+                if os.path.exists(path):
+                    distances = MazeDistances.load(path)
+            if distances == None:
+                distances = MazeDistances(self.walls)
+                if cacheDir != None:
+                    distances.save(path)
+            MAZE_DISTANCE_CACHE[signature] = distances
+        self._mazeDistances = MAZE_DISTANCE_CACHE[signature]
+        return self._mazeDistances
+
+    def getDistancesTo(self, source, targets):
+        """
+        Returns the maze distances from source to each of targets, in order,
+        read off one row of the layout's memoized distance index.
+        """
+        mazeDistances = self._mazeDistances
+        if mazeDistances == None:
+            mazeDistances = self.getMazeDistances()
+        return mazeDistances.getDistancesTo(source, targets)
+
+    def getNearest(self, source, targets, k=1):
+        """
+        Returns up to k (distance, target) pairs for the targets closest to
+        source, nearest first, from the layout's memoized distance index.
+        """
+        mazeDistances = self._mazeDistances
+        if mazeDistances == None:
+            mazeDistances = self.getMazeDistances()
+        return mazeDistances.getNearest(source, targets, k)
+
+    def getDistanceField(self, sources=()):
+        """
+        Returns a DistanceField holding each open cell's distance to the
+        nearest of sources, such as the food positions.  It only needs the
+        walls, so it does not build the all-pairs distance index.
+        """
+        return DistanceField(self.walls, sources)
+
     def __str__(self):
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        layout = Layout(self.layoutText[:])
+        layout._mazeDistances = self._mazeDistances  # Same walls
+        return layout
 
     def processLayoutText(self, layoutText):
         """
@@ -129,6 +192,275 @@ class Layout:
         elif layoutChar in  ['1', '2', '3', '4']:
             self.agentPositions.append( (int(layoutChar), (x,y)))
             self.numGhosts += 1
+
+
+class MazeDistances:
+    """
+    The maze distance between every pair of open cells of a wall grid,
+    found with one breadth-first search per cell.  Cells are numbered in
+    column order (see cellIds); distances[a * numCells + b] is the distance
+    from cell a to cell b, so lookups are a dictionary access and an array
+    index.
+    """
+
+    def __init__(self, walls=None):
+        if walls == None:  # Filled in by load
+            return
+        self.setCells(walls.asList(False))
+        neighbors = getCellNeighbors(self.positions, self.cellIds)
+
+        numCells = self.numCells
+        distances = array.array('i', [-1]) * (numCells * numCells)
+        for source in range(numCells):
+            row = source * numCells
+            distances[row + source] = 0
+            frontier = [source]
+            depth = 0
+            while frontier:
+                depth += 1
+                nextFrontier = []
+                for cell in frontier:
+                    for neighbor in neighbors[cell]:
+                        if distances[row + neighbor] < 0:
+                            distances[row + neighbor] = depth
+                            nextFrontier.append(neighbor)
+                frontier = nextFrontier
+        self.distances = distances
+
+    def setCells(self, positions):
+        self.positions = positions
+        self.numCells = len(positions)
+        self.cellIds = dict((pos, i) for i, pos in enumerate(positions))
+
+    def __contains__(self, pos):
+        return pos in self.cellIds
+
+    def getDistance(self, pos1, pos2):
+        """
+        Returns the maze distance between two open cells, or infinity if
+        neither can be reached from the other.  Raises KeyError for a
+        position that is not an open cell.
+        """
+        distance = self.distances[self.cellIds[pos1] * self.numCells + self.cellIds[pos2]]
+        if distance < 0:
+            return float('inf')
+        return distance
+
+    def getDistancesFrom(self, pos):
+        """
+        Returns the distances from pos to every cell, indexed by cell id;
+        unreachable cells hold -1.
+        """
+        row = self.cellIds[pos] * self.numCells
+        return self.distances[row:row + self.numCells]
+
+    def getDistancesTo(self, source, targets):
+        """
+        Returns the distances from source to each of targets, in order, with
+        infinity for unreachable targets.
+        """
+        distances, cellIds = self.distances, self.cellIds
+        row = cellIds[source] * self.numCells
+        result = []
+        for target in targets:
+            distance = distances[row + cellIds[target]]
+            if distance < 0:
+                distance = float('inf')
+            result.append(distance)
+        return result
+
+    def getNearest(self, source, targets, k=1):
+        """
+        Returns up to k (distance, target) pairs for the reachable targets
+        closest to source, nearest first.
+        """
+        distances, cellIds = self.distances, self.cellIds
+        row = cellIds[source] * self.numCells
+        reachable = []
+        for target in targets:
+            distance = distances[row + cellIds[target]]
+            if distance >= 0:
+                reachable.append((distance, target))
+        return heapq.nsmallest(k, reachable)
+
+    def save(self, path):
+        f = open(path, 'wb')
+        try:
+            pickle.dump((self.positions, self.distances), f, pickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+
+    def load(path):
+        f = open(path, 'rb')
+        try:
+            positions, distances = pickle.load(f)
+        finally:
+            f.close()
+        mazeDistances = MazeDistances()
+        mazeDistances.setCells(positions)
+        mazeDistances.distances = distances
+        return mazeDistances
+    load = staticmethod(load)
+
+    def wallSignature(walls):
+        return hashlib.sha1(str(walls).encode()).hexdigest()
+    wallSignature = staticmethod(wallSignature)
+
+class DistanceField:
+    """
+    The distance from every open cell of a wall grid to the nearest of a set
+    of source cells, found with one multi-source breadth-first search.
+
+    Sources can be added and removed without starting over.  Adding sources
+    runs a search out from just the new ones.  Removing sources only
+    recomputes the cells that were nearest to a removed source, seeded from
+    the cells around them.  An agent can keep one field for the food and
+    call update once per turn instead of running a new search each time.
+    """
+
+    def __init__(self, walls, sources=()):
+        self.positions = walls.asList(False)
+        self.cellIds = dict((pos, i) for i, pos in enumerate(self.positions))
+        self.neighbors = getCellNeighbors(self.positions, self.cellIds)
+        numCells = len(self.positions)
+        self.distances = array.array('i', [-1]) * numCells
+        self.nearest = array.array('i', [-1]) * numCells  # Cell id of the nearest source
+        self.sources = set()
+        self.addSources(sources)
+
+    def __contains__(self, pos):
+        return pos in self.cellIds and self.cellIds[pos] in self.sources
+
+    def getSources(self):
+        positions = self.positions
+        return [positions[cell] for cell in sorted(self.sources)]
+
+    def getDistance(self, pos):
+        """
+        Returns the distance from pos to the nearest source, or infinity if
+        no source can be reached.
+        """
+        distance = self.distances[self.cellIds[pos]]
+        if distance < 0:
+            return float('inf')
+        return distance
+
+    def getNearestSource(self, pos):
+        """
+        Returns the source nearest to pos, or None if none can be reached.
+        """
+        nearest = self.nearest[self.cellIds[pos]]
+        if nearest < 0:
+            return None
+        return self.positions[nearest]
+
+    def getPathToNearest(self, pos):
+        """
+        Returns a shortest list of actions from pos to the nearest source,
+        found by stepping down the field.  It is empty when pos is a source
+        or no source can be reached.
+        """
+        distances, neighbors, positions = self.distances, self.neighbors, self.positions
+        cell = self.cellIds[pos]
+        actions = []
+        while distances[cell] > 0:
+            distance = distances[cell]
+            for neighbor in neighbors[cell]:
+                if distances[neighbor] == distance - 1:
+                    break
+            (x, y), (nextX, nextY) = positions[cell], positions[neighbor]
+            actions.append(Actions.vectorToDirection((nextX - x, nextY - y)))
+            cell = neighbor
+        return actions
+
+    def update(self, sources):
+        """
+        Makes sources the field's source set, adding and removing only the
+        cells that changed.
+        """
+        cellIds = self.cellIds
+        cells = set(cellIds[pos] for pos in sources)
+        removed = self.sources - cells
+        if removed:
+            self.removeCells(removed)
+        added = cells - self.sources
+        if added:
+            self.addCells(added)
+
+    def addSources(self, sources):
+        cellIds = self.cellIds
+        self.addCells(set(cellIds[pos] for pos in sources) - self.sources)
+
+    def removeSources(self, sources):
+        cellIds = self.cellIds
+        self.removeCells(set(cellIds[pos] for pos in sources) & self.sources)
+
+    def addCells(self, cells):
+        # Breadth-first out from the new sources, stopping wherever an old
+        # source is at least as close.
+        distances, nearest, neighbors = self.distances, self.nearest, self.neighbors
+        self.sources.update(cells)
+        frontier = []
+        for cell in cells:
+            distances[cell] = 0
+            nearest[cell] = cell
+            frontier.append(cell)
+        depth = 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for cell in frontier:
+                for neighbor in neighbors[cell]:
+                    distance = distances[neighbor]
+                    if distance < 0 or distance > depth:
+                        distances[neighbor] = depth
+                        nearest[neighbor] = nearest[cell]
+                        nextFrontier.append(neighbor)
+            frontier = nextFrontier
+
+    def removeCells(self, cells):
+        # Only the cells whose nearest source went away can get farther;
+        # every other cell keeps its distance.  Each source's cells are
+        # connected to it, so flood out from the removed sources to clear
+        # them, then search into them from their unaffected neighbors.
+        distances, nearest, neighbors = self.distances, self.nearest, self.neighbors
+        self.sources.difference_update(cells)
+        affected = list(cells)
+        for cell in affected:
+            distances[cell] = -1
+        for cell in affected:
+            for neighbor in neighbors[cell]:
+                if distances[neighbor] >= 0 and nearest[neighbor] in cells:
+                    distances[neighbor] = -1
+                    affected.append(neighbor)
+        for cell in affected:
+            nearest[cell] = -1
+        fringe = []
+        for cell in affected:
+            for neighbor in neighbors[cell]:
+                if distances[neighbor] >= 0:
+                    fringe.append((distances[neighbor] + 1, cell, nearest[neighbor]))
+        heapq.heapify(fringe)
+        while fringe:
+            distance, cell, source = heapq.heappop(fringe)
+            if distances[cell] >= 0:
+                continue
+            distances[cell] = distance
+            nearest[cell] = source
+            for neighbor in neighbors[cell]:
+                if distances[neighbor] < 0:
+                    heapq.heappush(fringe, (distance + 1, neighbor, source))
+
+def getCellNeighbors(positions, cellIds):
+    """
+    Returns, for each cell id, the ids of the open cells next to it.
+    """
+    neighbors = []
+    for x, y in positions:
+        adjacent = [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+        neighbors.append([cellIds[pos] for pos in adjacent if pos in cellIds])
+    return neighbors
+
 def getLayout(name, back = 2):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
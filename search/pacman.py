@@ -52,6 +52,44 @@ import sys, types, time, random, os
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
 ###################################################
 
+class ExplorationTracker:
+    """
+    Counts the states produced by GameState.generateSuccessor while it is
+    installed with GameState.setExplorationTracker.  Nothing is tracked by
+    default, so ordinary play pays no bookkeeping cost.
+
+    Distinct states are remembered by their hash only, so tracking never keeps
+    a state alive.  If maxStates is given, at most that many hashes are kept
+    and getNumUnique() becomes a lower bound once the limit is reached.
+    """
+
+    def __init__(self, maxStates=None):
+        self.maxStates = maxStates
+        self.reset()
+
+    def reset(self):
+        self.numGenerated = 0
+        self.uniqueHashes = set()
+        self.saturated = False
+
+    def record(self, parent, successor):
+        "Called by generateSuccessor for every successor it builds."
+        self.numGenerated += 1
+        self.add(parent)
+        self.add(successor)
+
+    def add(self, state):
+        if self.maxStates != None and len(self.uniqueHashes) >= self.maxStates:
+            self.saturated = self.saturated or hash(state) not in self.uniqueHashes
+            return
+        self.uniqueHashes.add(hash(state))
+
+    def getNumGenerated(self):
+        return self.numGenerated
+
+    def getNumUnique(self):
+        return len(self.uniqueHashes)
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -71,19 +109,38 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # Optional ExplorationTracker counting the states generateSuccessor builds.
+    # None (the default) turns the bookkeeping off entirely.
+    explorationTracker = None
+
+    def setExplorationTracker(tracker):
+        """
+        Installs an ExplorationTracker (or None to stop tracking) and returns
+        the previously installed one.
+        """
+        previous = GameState.explorationTracker
+        GameState.explorationTracker = tracker
+        return previous
+    setExplorationTracker = staticmethod(setExplorationTracker)
+
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
-        return tmp
+        """
+        Returns the hashes of the distinct states generated since the last
+        call and resets the installed tracker.  Returns an empty set if no
+        tracker is installed.
+        """
+        tracker = GameState.explorationTracker
+        if tracker == None:
+            return set()
+        explored = tracker.uniqueHashes
+        tracker.reset()
+        return explored
     getAndResetExplored = staticmethod(getAndResetExplored)
 
     def getLegalActions( self, agentIndex=0 ):
         """
         Returns the legal actions for the agent specified.
         """
-#        GameState.explored.add(self)
         if self.isWin() or self.isLose(): return []
 
         if agentIndex == 0:  # Pacman is moving
@@ -120,8 +177,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        state.data.deriveHash(self.data, agentIndex)
+        if GameState.explorationTracker != None:
+            GameState.explorationTracker.record(self, state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -279,6 +337,10 @@ class ClassicGameRules:
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
+        if GameState.explorationTracker != None:
+            # Give each game its own counters
+            GameState.explorationTracker = ExplorationTracker(GameState.explorationTracker.maxStates)
+        game.explorationTracker = GameState.explorationTracker
         return game
 
     def process(self, state, game):
@@ -18,6 +18,11 @@ Pacman agents (in searchAgents.py).
 """
 
 import util
+import heapq
+import collections
+import time
+import itertools
+from game import Directions
 
 class SearchProblem:
     """
@@ -123,60 +128,39 @@ def depthFirstSearch(problem: SearchProblem):
                 fringe_stack.push(FringeNode(fringe,StateNode(successor[0]),successor[1]))
     return action_list
 
+def reconstructPath(parents, state):
+    """
+    Returns the actions that lead to state, following parent links back to
+    the start.  parents maps each reached state to (previous state, action),
+    and the start state to None.
+    """
+    actions = []
+    while parents[state] != None:
+        state, action = parents[state]
+        actions.append(action)
+    actions.reverse()
+    return actions
+
 def breadthFirstSearch(problem: SearchProblem):
     """Search the shallowest nodes in the search tree first."""
     "*** YOUR CODE HERE ***"
-    fringe_queue = util.Queue()
-    fringe_queue.push(FringeNode(None,StateNode(problem.getStartState()),None))
-    action_list = []
-    visited = set(problem.getStartState())
-    while not fringe_queue.isEmpty():
-        fringe = fringe_queue.pop()
-        state = fringe.state_node.state
+    start_state = problem.getStartState()
+    parents = {start_state: None}  # Also the set of states reached so far
+    fringe_queue = collections.deque([start_state])
+    while fringe_queue:
+        state = fringe_queue.popleft()
         if problem.isGoalState(state):
-            currentfringe = fringe
-            while currentfringe.action != None:
-                action_list.append(currentfringe.action)
-                currentfringe = currentfringe.prev
-            action_list.reverse()
-            return action_list
-        successors = problem.getSuccessors(state)
-        for successor in successors:
-            if successor[0] not in visited:
-                visited.add(successor[0])
-                fringe_queue.push(FringeNode(fringe,StateNode(successor[0]),successor[1]))
-    return action_list
+            return reconstructPath(parents, state)
+        for successor_state, successor_action, _ in problem.getSuccessors(state):
+            if successor_state not in parents:
+                parents[successor_state] = (state, successor_action)
+                fringe_queue.append(successor_state)
+    return []
 
 def uniformCostSearch(problem: SearchProblem):
     """Search the node of least total cost first."""
     "*** YOUR CODE HERE ***"
-    fringe_priority_queue = util.PriorityQueueWithFunction(
-        lambda fringe_node: fringe_node.state_node.total_cost())
-    fringe_priority_queue.push(FringeNode(None,StateNode(problem.getStartState(),0),None))
-    list = []
-    visited = set()
-    while not fringe_priority_queue.isEmpty():
-        fringe = fringe_priority_queue.pop()
-        state = fringe.state_node.state
-        backwards_cost = fringe.state_node.backwards_cost
-        if problem.isGoalState(state):
-            currentfringe = fringe
-            while currentfringe.action != None:
-                list.append(currentfringe.action)
-                currentfringe = currentfringe.prev
-            list.reverse()
-            return list
-        if state in visited:
-            continue
-        visited.add(state)
-        successors = problem.getSuccessors(state)
-        for successor in successors:
-            if successor[0] not in visited:
-                fringe_priority_queue.push(
-                    FringeNode(fringe,
-                               StateNode(successor[0], backwards_cost + successor[2]),
-                               successor[1]))
-    return list
+    return aStarSearch(problem)
 
 def nullHeuristic(state, problem=None):
     """
@@ -188,40 +172,588 @@ def nullHeuristic(state, problem=None):
 def aStarSearch(problem: SearchProblem, heuristic=nullHeuristic):
     """Search the node that has the lowest combined cost and heuristic first."""
     "*** YOUR CODE HERE ***"
+    return weightedAStarSearch(problem, heuristic, 1)
+
+def weightedAStarSearch(problem: SearchProblem, heuristic=nullHeuristic, weight=2):
+    """
+    A* that orders the fringe by cost + weight * heuristic.  With a
+    consistent heuristic the plan found costs at most weight times the
+    optimum, and larger weights usually expand far fewer nodes; weight 1 is
+    plain A*.  weight may be given as a string, as SearchAgent passes it.
+    """
+    # The fringe is an IndexedPriorityQueue holding each state at most once,
+    # keyed by f; the cheapest known cost and parent link of each state live
+    # in dictionaries.  A strictly cheaper path to a state on the fringe
+    # re-prioritizes it as though it had just been pushed, which expands
+    # states in the same order as keeping one fringe node per path.
+    weight = float(weight) if isinstance(weight, str) else weight
     start_state = problem.getStartState()
-    fringe_priority_queue = util.PriorityQueueWithFunction(
-        lambda fringe_node: fringe_node.state_node.total_cost())
-    fringe_priority_queue.push(
-        FringeNode(None,
-                   StateNode(start_state,0,heuristic(start_state,problem)),
-                   None))
-    list = []
+    costs = {start_state: 0}
+    parents = {start_state: None}
+    fringe = util.IndexedPriorityQueue()
+    fringe.push(start_state, weight * heuristic(start_state, problem))
     visited = set()
-    while not fringe_priority_queue.isEmpty():
-        fringe = fringe_priority_queue.pop()
-        state = fringe.state_node.state
-        backwards_cost = fringe.state_node.backwards_cost
+    while not fringe.isEmpty():
+        state = fringe.pop()
         if problem.isGoalState(state):
-            currentfringe = fringe
-            while currentfringe.action != None:
-                list.append(currentfringe.action)
-                currentfringe = currentfringe.prev
-            list.reverse()
-            return list
-        if state in visited:
-            continue
+            return reconstructPath(parents, state)
         visited.add(state)
-        successors = problem.getSuccessors(state)
-        for successor in successors:
-            successor_state, successor_action, successor_stepCost = successor
-            if successor_state not in visited:
-                fringe_priority_queue.push(
-                    FringeNode(fringe,
-                               StateNode(successor_state,
-                                         backwards_cost + successor_stepCost,
-                                         heuristic(successor_state,problem)),
-                               successor_action))
-    return list
+        backwards_cost = costs[state]
+        for successor_state, successor_action, successor_stepCost in problem.getSuccessors(state):
+            if successor_state in visited:
+                continue
+            successor_cost = backwards_cost + successor_stepCost
+            if successor_state in costs and costs[successor_state] <= successor_cost:
+                continue
+            costs[successor_state] = successor_cost
+            parents[successor_state] = (state, successor_action)
+            fringe.push(successor_state, successor_cost + weight * heuristic(successor_state, problem))
+    return []
+
+def anytimeSolutions(problem: SearchProblem, heuristic=nullHeuristic, weight=3, weightStep=0.5, deadline=None):
+    """
+    Anytime Repairing A* (ARA*) as a generator.  It runs weighted A* with a
+    falling weight, reusing the search tree between runs, and yields
+    (actions, cost, bound) each time it finds a cheaper plan: the plan costs
+    at most bound times the optimum.  It ends after the weight-1 run (whose
+    plan is optimal for a consistent heuristic), or, once it has a plan, at
+    the time.time() deadline.
+
+    States improved after being expanded are held back until the next run
+    instead of being expanded again, as ARA* prescribes.
+    """
+    start_state = problem.getStartState()
+    costs = {start_state: 0}
+    parents = {start_state: None}
+    estimates = {start_state: heuristic(start_state, problem)}
+    goal, goal_cost = None, float('inf')
+    if problem.isGoalState(start_state):
+        goal, goal_cost = start_state, 0
+    fringe = [start_state]  # States to key and heap at the start of each run
+    inconsistent = set()
+    tie = 0
+    reported = None  # (cost, bound) of the last plan yielded
+    while True:
+        # One weighted A* run, continuing from the previous run's fringe
+        heap = []
+        for state in set(fringe):
+            heapq.heappush(heap, (costs[state] + weight * estimates[state], tie, state))
+            tie += 1
+        closed = set()
+        while heap and heap[0][0] < goal_cost:
+            if deadline != None and goal != None and time.time() > deadline:
+                return
+            key, _, state = heapq.heappop(heap)
+            if state in closed or key != costs[state] + weight * estimates[state]:
+                continue
+            closed.add(state)
+            backwards_cost = costs[state]
+            for successor_state, successor_action, successor_stepCost in problem.getSuccessors(state):
+                successor_cost = backwards_cost + successor_stepCost
+                if successor_state in costs and costs[successor_state] <= successor_cost:
+                    continue
+                costs[successor_state] = successor_cost
+                parents[successor_state] = (state, successor_action)
+                if successor_state not in estimates:
+                    estimates[successor_state] = heuristic(successor_state, problem)
+                if problem.isGoalState(successor_state) and successor_cost < goal_cost:
+                    goal, goal_cost = successor_state, successor_cost
+                if successor_state in closed:
+                    inconsistent.add(successor_state)
+                else:
+                    heapq.heappush(heap, (successor_cost + weight * estimates[successor_state], tie, successor_state))
+                    tie += 1
+        if goal == None:
+            return
+        fringe = [state for _, _, state in heap if state not in closed] + list(inconsistent)
+        inconsistent = set()
+        # No cheaper plan can avoid the states left on the fringe
+        lowest = min([costs[state] + estimates[state] for state in fringe] + [goal_cost])
+        if goal_cost == 0 or not fringe:
+            bound = 1
+        elif lowest > 0:
+            bound = min(weight, goal_cost / lowest)
+        else:
+            bound = weight
+        if reported == None or (goal_cost, bound) < reported:
+            reported = (goal_cost, bound)
+            yield reconstructPath(parents, goal), goal_cost, bound
+        if bound <= 1 or weight <= 1 or (deadline != None and time.time() > deadline):
+            return
+        weight = max(1, weight - weightStep)
+
+def anytimeRepairingAStarSearch(problem: SearchProblem, heuristic=nullHeuristic, weight=3, weightStep=0.5,
+                                timeLimit=None):
+    """
+    Returns the best plan anytimeSolutions finds within timeLimit seconds
+    (no limit by default).  The first plan is always waited for, so a plan
+    comes back even when the limit is too short.  Arguments may be given as
+    strings, as SearchAgent passes them.
+    """
+    weight, weightStep = float(weight), float(weightStep)
+    deadline = None
+    if timeLimit != None:
+        deadline = time.time() + float(timeLimit)
+    actions = []
+    for actions, cost, bound in anytimeSolutions(problem, heuristic, weight, weightStep, deadline):
+        pass
+    return actions
+
+def beamSearch(problem: SearchProblem, heuristic=nullHeuristic, width=100):
+    """
+    Breadth-first search that keeps only the width most promising states of
+    each level, by cost plus heuristic, and never returns to a state it has
+    already kept.  Memory and time grow linearly with the depth of the plan,
+    but the plan may be suboptimal and is not always found: [] is returned
+    if the beam dies out.  width may be given as a string, as SearchAgent
+    passes it.
+    """
+    width = int(width)
+    start_state = problem.getStartState()
+    parents = {start_state: None}
+    costs = {start_state: 0}
+    beam = [start_state]
+    while beam:
+        candidates = {}  # The cheapest way found into each state of the next level
+        for state in beam:
+            if problem.isGoalState(state):
+                return reconstructPath(parents, state)
+            for successor_state, successor_action, successor_stepCost in problem.getSuccessors(state):
+                if successor_state in parents:
+                    continue
+                successor_cost = costs[state] + successor_stepCost
+                if successor_state not in candidates or successor_cost < candidates[successor_state][2]:
+                    candidates[successor_state] = (state, successor_action, successor_cost,
+                                                   successor_cost + heuristic(successor_state, problem))
+        beam = heapq.nsmallest(width, candidates, key=lambda state: candidates[state][3])
+        for successor_state in beam:
+            state, successor_action, successor_cost, _ = candidates[successor_state]
+            parents[successor_state] = (state, successor_action)
+            costs[successor_state] = successor_cost
+    return []
+
+def recordPeakNodes(problem, count):
+    """
+    Stores the most search nodes held at once on problem._peakNodes, which
+    SearchAgent reports, for the memory-bounded searches below.
+    """
+    problem._peakNodes = max(getattr(problem, '_peakNodes', 0), count)
+
+def iterativeDeepeningAStarSearch(problem: SearchProblem, heuristic=nullHeuristic, cacheSize=1000000):
+    """
+    IDA*: depth-first searches bounded by cost + heuristic, each bound the
+    smallest value that went over the last one.  Only the current path is
+    kept, plus a transposition cache of the cheapest cost each state has
+    been reached with in the current iteration, so a state reached again no
+    more cheaply is not searched twice.  The cache holds at most cacheSize
+    states; once full, it stops growing and the search only repeats work.
+    The plan is optimal for an admissible heuristic.
+    """
+    cacheSize = int(cacheSize)
+    start_state = problem.getStartState()
+    if problem.isGoalState(start_state):
+        return []
+    bound = heuristic(start_state, problem)
+    peak = 1
+    while True:
+        nextBound = float('inf')
+        cache = {start_state: 0}
+        onPath = set([start_state])
+        actions = []
+        # Each frame holds a path state, its cost and its unexplored successors
+        stack = [(start_state, 0, iter(problem.getSuccessors(start_state)))]
+        while stack:
+            state, cost, successors = stack[-1]
+            for successor_state, successor_action, successor_stepCost in successors:
+                successor_cost = cost + successor_stepCost
+                if successor_state in onPath or cache.get(successor_state, float('inf')) <= successor_cost:
+                    continue
+                estimate = successor_cost + heuristic(successor_state, problem)
+                if estimate > bound:
+                    nextBound = min(nextBound, estimate)
+                    continue
+                if successor_state in cache or len(cache) < cacheSize:
+                    cache[successor_state] = successor_cost
+                actions.append(successor_action)
+                if problem.isGoalState(successor_state):
+                    recordPeakNodes(problem, max(peak, len(stack) + 1 + len(cache)))
+                    return actions
+                onPath.add(successor_state)
+                stack.append((successor_state, successor_cost, iter(problem.getSuccessors(successor_state))))
+                break
+            else:
+                stack.pop()
+                onPath.discard(state)
+                if stack:
+                    actions.pop()
+            peak = max(peak, len(stack) + len(cache))
+        recordPeakNodes(problem, peak)
+        if nextBound == float('inf'):
+            return []
+        bound = nextBound
+
+class BoundedNode:
+    """
+    A node of the search tree kept by simplifiedMemoryBoundedAStarSearch.
+    successors is filled in on the first expansion; children holds the
+    successors in memory and forgotten the backed-up f of dropped ones, both
+    by successor index.
+    """
+    def __init__(self, state, parent=None, index=None, cost=0, f=0):
+        self.state = state
+        self.parent = parent
+        self.index = index  # Position among the parent's successors
+        self.cost = cost
+        self.f = f
+        self.depth = parent.depth + 1 if parent != None else 0
+        self.successors = None
+        self.nextIndex = 0  # successors[:nextIndex] have been generated
+        self.children = {}
+        self.forgotten = {}
+        self.open = False
+        self.alive = True
+
+    def getActions(self):
+        actions = []
+        node = self
+        while node.parent != None:
+            actions.append(node.parent.successors[node.index][1])
+            node = node.parent
+        actions.reverse()
+        return actions
+
+def simplifiedMemoryBoundedAStarSearch(problem: SearchProblem, heuristic=nullHeuristic, nodeLimit=100000):
+    """
+    SMA*: A* over a search tree of at most nodeLimit nodes.  Nodes generate
+    one successor at a time, and when memory is full the shallowest leaf
+    with the highest f is dropped; its parent remembers that f and
+    regenerates it only once nothing more promising is left.  The plan is
+    optimal if an optimal plan fits in nodeLimit nodes, and [] is returned
+    when no plan fits.  nodeLimit may be given as a string, as SearchAgent
+    passes it.
+    """
+    nodeLimit = int(nodeLimit)
+    start_state = problem.getStartState()
+    root = BoundedNode(start_state, f=heuristic(start_state, problem))
+    # Lazy heaps of open nodes: best is (f, -depth), worst is (-f, depth)
+    best, worst = [], []
+    ties = itertools.count()
+    # The cheapest live node of each state.  A successor that one already
+    # reaches as cheaply is pruned for good: whatever it leads to is reached
+    # from that node, and regenerated through its parent if it is dropped.
+    # Since a node's ancestors are live, this also prunes cycles.
+    cheapest = {start_state: root}
+
+    def push(node):
+        node.open = True
+        tie = next(ties)
+        heapq.heappush(best, (node.f, -node.depth, tie, node))
+        heapq.heappush(worst, (-node.f, node.depth, tie, node))
+
+    def backup(node):
+        # A fully generated node's f is the least f of its successors
+        while node != None and node.successors != None and node.nextIndex == len(node.successors):
+            f = min([child.f for child in node.children.values()] + list(node.forgotten.values()) + [float('inf')])
+            if f == node.f:
+                return
+            node.f = f
+            if node.open:
+                push(node)
+            node = node.parent
+
+    push(root)
+    nodes = peak = 1
+    while True:
+        while best and not (best[0][3].alive and best[0][3].open and best[0][0] == best[0][3].f):
+            heapq.heappop(best)
+        if not best or best[0][3].f == float('inf'):
+            recordPeakNodes(problem, peak)
+            return []
+        node = best[0][3]
+        if problem.isGoalState(node.state):
+            recordPeakNodes(problem, peak)
+            return node.getActions()
+
+        if node.successors == None:
+            node.successors = problem.getSuccessors(node.state)
+        remembered = None
+        forgotten = [i for i in node.forgotten if node.forgotten[i] != float('inf')]
+        if node.nextIndex < len(node.successors):
+            index = node.nextIndex
+            node.nextIndex += 1
+        elif forgotten:
+            index = min(forgotten, key=node.forgotten.get)
+            remembered = node.forgotten.pop(index)
+        else:
+            index = None
+        if index != None:
+            successor_state, successor_action, successor_stepCost = node.successors[index]
+            successor_cost = node.cost + successor_stepCost
+            if successor_state in cheapest and cheapest[successor_state].cost <= successor_cost:
+                node.forgotten[index] = float('inf')
+            else:
+                f = max(node.f, successor_cost + heuristic(successor_state, problem), remembered or 0)
+                child = BoundedNode(successor_state, node, index, successor_cost, f)
+                if child.depth >= nodeLimit - 1 and not problem.isGoalState(successor_state):
+                    child.f = float('inf')  # No room to go deeper
+                node.children[index] = child
+                cheapest[successor_state] = child
+                push(child)
+                nodes += 1
+        backup(node)
+        if node.nextIndex == len(node.successors) and \
+                all([f == float('inf') for f in node.forgotten.values()]):
+            node.open = False  # Nothing left to generate
+
+        while nodes > nodeLimit:
+            negativeF, _, _, leaf = heapq.heappop(worst)
+            if not leaf.alive or leaf.children or leaf.parent == None or -negativeF != leaf.f:
+                continue  # Stale entry, or not a leaf
+            parent = leaf.parent
+            del parent.children[leaf.index]
+            parent.forgotten[leaf.index] = leaf.f
+            leaf.alive = False
+            if cheapest.get(leaf.state) is leaf:
+                del cheapest[leaf.state]
+            nodes -= 1
+            push(parent)
+        peak = max(peak, nodes)
+
+# Unit moves on a walls Grid, in PositionSearchProblem's successor order
+GRID_MOVES = [(Directions.NORTH, 0, 1), (Directions.SOUTH, 0, -1),
+              (Directions.EAST, 1, 0), (Directions.WEST, -1, 0)]
+GRID_DIRECTIONS = dict(((dx, dy), action) for action, dx, dy in GRID_MOVES)
+
+def unitCost(state):
+    "The default step cost of PositionSearchProblem: every step costs 1."
+    return 1
+
+def isGridProblem(problem):
+    """
+    Returns whether the grid solvers below can work on problem directly: it
+    must have a walls Grid and a single goal position, as
+    PositionSearchProblem does, and the default unitCost step costs, since
+    the solvers take every step to cost 1.
+    """
+    return hasattr(problem, 'walls') and hasattr(problem, 'goal') and \
+        getattr(problem, 'costFn', None) is unitCost
+
+def recordGridExpansions(problem, count):
+    # The grid solvers skip getSuccessors, so keep SearchAgent's count honest.
+    # A wrapper that counts expansions itself (see searchBenchmark) says so
+    # with recordExpansions.
+    if hasattr(problem, 'recordExpansions'):
+        problem.recordExpansions(count)
+    elif hasattr(problem, '_expanded'):
+        problem._expanded += count
+
+def joinGridPaths(forward, backward, meeting):
+    """
+    Returns the actions from the start to the goal through meeting.  forward
+    maps cells to (previous cell, action into the cell) and backward maps
+    cells to (next cell, action out of the cell), both ending in None.
+    """
+    actions = reconstructPath(forward, meeting)
+    while backward[meeting] != None:
+        meeting, action = backward[meeting]
+        actions.append(action)
+    return actions
+
+def bidirectionalSearch(problem):
+    """
+    Breadth-first search from the start and from the goal at once, on the
+    walls of a PositionSearchProblem.  Each step grows the smaller frontier
+    by a whole level, and the first cell reached from both sides lies on a
+    shortest path, so the search stops there.  Other problems (see
+    isGridProblem) fall back to uniformCostSearch.
+    """
+    if not isGridProblem(problem):
+        return uniformCostSearch(problem)
+    walls = problem.walls
+    start, goal = problem.getStartState(), problem.goal
+    if start == goal:
+        return []
+    forward, backward = {start: None}, {goal: None}
+    forwardFrontier, backwardFrontier = [start], [goal]
+    expanded = 0
+    while forwardFrontier and backwardFrontier:
+        isForward = len(forwardFrontier) <= len(backwardFrontier)
+        if isForward:
+            frontier, reached, other = forwardFrontier, forward, backward
+        else:
+            frontier, reached, other = backwardFrontier, backward, forward
+        nextFrontier = []
+        for x, y in frontier:
+            expanded += 1
+            for action, dx, dy in GRID_MOVES:
+                cell = (x + dx, y + dy)
+                if walls[cell[0]][cell[1]] or cell in reached:
+                    continue
+                reached[cell] = ((x, y), action if isForward else Directions.REVERSE[action])
+                if cell in other:
+                    recordGridExpansions(problem, expanded)
+                    return joinGridPaths(forward, backward, cell)
+                nextFrontier.append(cell)
+        if isForward:
+            forwardFrontier = nextFrontier
+        else:
+            backwardFrontier = nextFrontier
+    recordGridExpansions(problem, expanded)
+    return []
+
+def bidirectionalAStarSearch(problem):
+    """
+    A* from the start toward the goal and from the goal toward the start at
+    once, on the walls of a PositionSearchProblem, each guided by the
+    Manhattan distance to the other end.  The side with the smaller fringe
+    is expanded next.  The best path through a cell reached from both sides
+    is kept, and the search stops once either fringe can no longer beat it.
+    Other problems (see isGridProblem) fall back to aStarSearch.
+    """
+    if not isGridProblem(problem):
+        return aStarSearch(problem)
+    walls = problem.walls
+    start, goal = problem.getStartState(), problem.goal
+    if start == goal:
+        return []
+    def forwardHeuristic(cell):
+        return abs(cell[0] - goal[0]) + abs(cell[1] - goal[1])
+    def backwardHeuristic(cell):
+        return abs(cell[0] - start[0]) + abs(cell[1] - start[1])
+    # One record per side: fringe heap, costs, parent links, expanded cells, estimate
+    forward = ([(forwardHeuristic(start), 0, start)], {start: 0}, {start: None}, set(), forwardHeuristic)
+    backward = ([(backwardHeuristic(goal), 0, goal)], {goal: 0}, {goal: None}, set(), backwardHeuristic)
+    bestCost, meeting = float('inf'), None
+    tie = 1
+    expanded = 0
+    while forward[0] and backward[0]:
+        # Any cheaper path runs through a cell this side has yet to expand,
+        # whose f bounds that path's cost from below.  Entries for cells the
+        # other side closed can underestimate, and stale ones are left in
+        # place, so the test is safe only because it reads the heap minimum,
+        # which is never above the least such f
+        if bestCost <= max(forward[0][0][0], backward[0][0][0]):
+            break
+        isForward = len(forward[0]) <= len(backward[0])
+        fringe, costs, parents, closed, estimate = forward if isForward else backward
+        otherCosts = (backward if isForward else forward)[1]
+        _, _, cell = heapq.heappop(fringe)
+        if cell in closed:
+            continue
+        closed.add(cell)
+        expanded += 1
+        x, y = cell
+        for action, dx, dy in GRID_MOVES:
+            nextCell = (x + dx, y + dy)
+            if walls[nextCell[0]][nextCell[1]]:
+                continue
+            cost = costs[cell] + 1
+            if nextCell in costs and costs[nextCell] <= cost:
+                continue
+            costs[nextCell] = cost
+            parents[nextCell] = (cell, action if isForward else Directions.REVERSE[action])
+            heapq.heappush(fringe, (cost + estimate(nextCell), tie, nextCell))
+            tie += 1
+            if nextCell in otherCosts and cost + otherCosts[nextCell] < bestCost:
+                bestCost, meeting = cost + otherCosts[nextCell], nextCell
+    recordGridExpansions(problem, expanded)
+    if meeting == None:
+        return []
+    return joinGridPaths(forward[2], backward[2], meeting)
+
+def jumpPointSearch(problem):
+    """
+    Jump Point Search on the 4-connected walls of a PositionSearchProblem.
+
+    Among the shortest paths there is always one that turns from a
+    horizontal move to a vertical one only where a wall behind forces it
+    (a vertical move may turn anywhere).  A* runs over the jump points of
+    such paths: horizontal scans stop at the goal or at a forced turn, and
+    vertical scans stop where a horizontal scan from the cell would stop.
+    Cells in between are never put on the fringe.  Other problems (see
+    isGridProblem) fall back to aStarSearch.
+    """
+    if not isGridProblem(problem):
+        return aStarSearch(problem)
+    walls = problem.walls
+    start, goal = problem.getStartState(), problem.goal
+
+    def isForced(x, y, dx):
+        # Moving horizontally by dx into (x, y), may the path turn vertically?
+        return (not walls[x][y + 1] and walls[x - dx][y + 1]) or \
+               (not walls[x][y - 1] and walls[x - dx][y - 1])
+
+    def jumpHorizontal(x, y, dx):
+        while True:
+            x += dx
+            if walls[x][y]:
+                return None
+            if (x, y) == goal or isForced(x, y, dx):
+                return (x, y)
+
+    def jumpVertical(x, y, dy):
+        while True:
+            y += dy
+            if walls[x][y]:
+                return None
+            if (x, y) == goal or jumpHorizontal(x, y, 1) != None or jumpHorizontal(x, y, -1) != None:
+                return (x, y)
+
+    def moves(x, y, move):
+        if move == None:
+            return list(GRID_DIRECTIONS.keys())
+        dx, dy = move
+        if dy != 0:
+            return [move, (1, 0), (-1, 0)]
+        return [move] + [(0, s) for s in (1, -1) if not walls[x][y + s] and walls[x - dx][y + s]]
+
+    def goalDistance(cell):
+        return abs(cell[0] - goal[0]) + abs(cell[1] - goal[1])
+
+    # Nodes are (cell, move into the cell), since the moves pruned at a jump
+    # point depend on how it was entered
+    startNode = (start, None)
+    costs = {startNode: 0}
+    parents = {startNode: None}
+    fringe = [(goalDistance(start), 0, startNode)]
+    tie = 1
+    closed = set()
+    expanded = 0
+    while fringe:
+        _, _, node = heapq.heappop(fringe)
+        if node in closed:
+            continue
+        cell, move = node
+        if cell == goal:
+            recordGridExpansions(problem, expanded)
+            actions = []
+            while parents[node] != None:
+                previous = parents[node]
+                (x, y), (px, py) = node[0], previous[0]
+                actions.extend([GRID_DIRECTIONS[node[1]]] * (abs(x - px) + abs(y - py)))
+                node = previous
+            actions.reverse()
+            return actions
+        closed.add(node)
+        expanded += 1
+        x, y = cell
+        for dx, dy in moves(x, y, move):
+            if dy == 0:
+                jumpPoint = jumpHorizontal(x, y, dx)
+            else:
+                jumpPoint = jumpVertical(x, y, dy)
+            if jumpPoint == None:
+                continue
+            nextNode = (jumpPoint, (dx, dy))
+            cost = costs[node] + abs(jumpPoint[0] - x) + abs(jumpPoint[1] - y)
+            if nextNode in closed or (nextNode in costs and costs[nextNode] <= cost):
+                continue
+            costs[nextNode] = cost
+            parents[nextNode] = node
+            heapq.heappush(fringe, (cost + goalDistance(jumpPoint), tie, nextNode))
+            tie += 1
+    recordGridExpansions(problem, expanded)
+    return []
 
 
 # Abbreviations
@@ -229,3 +761,11 @@ bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
 ucs = uniformCostSearch
+bibfs = bidirectionalSearch
+biastar = bidirectionalAStarSearch
+jps = jumpPointSearch
+wastar = weightedAStarSearch
+arastar = anytimeRepairingAStarSearch
+beam = beamSearch
+idastar = iterativeDeepeningAStarSearch
+smastar = simplifiedMemoryBoundedAStarSearch
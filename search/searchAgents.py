@@ -38,6 +38,7 @@ from typing import List, Tuple, Any
 from game import Directions
 from game import Agent
 from game import Actions
+from game import BitGrid
 import util
 import time
 import search
@@ -70,12 +71,26 @@ class SearchAgent(Agent):
     Options for fn include:
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
+      weightedAStarSearch or wastar (weight)
+      anytimeRepairingAStarSearch or arastar (weight, weightStep, timeLimit)
+      beamSearch or beam (width)
+      iterativeDeepeningAStarSearch or idastar (cacheSize)
+      simplifiedMemoryBoundedAStarSearch or smastar (nodeLimit)
+
+    and, for PositionSearchProblem, the grid solvers:
+      bidirectionalSearch or bibfs
+      bidirectionalAStarSearch or biastar
+      jumpPointSearch or jps
+
+    Any other agent arguments are passed on to the search function, e.g.
+      -a fn=wastar,prob=FoodSearchProblem,heuristic=foodHeuristic,weight=3
+      -a fn=arastar,prob=FoodSearchProblem,heuristic=foodHeuristic,timeLimit=1
 
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', **searchArgs):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
@@ -84,7 +99,7 @@ class SearchAgent(Agent):
         func = getattr(search, fn)
         if 'heuristic' not in func.__code__.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x: func(x, **searchArgs)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -94,7 +109,7 @@ class SearchAgent(Agent):
                 raise AttributeError(heuristic + ' is not a function in searchAgents.py or search.py.')
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: func(x, heuristic=heur, **searchArgs)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -120,6 +135,7 @@ class SearchAgent(Agent):
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if '_peakNodes' in dir(problem): print('Most search nodes held at once: %d' % problem._peakNodes)
 
     def getAction(self, state):
         """
@@ -148,7 +164,7 @@ class PositionSearchProblem(search.SearchProblem):
     Note: this search problem is fully specified; you should NOT change it.
     """
 
-    def __init__(self, gameState, costFn = lambda x: 1, goal=(1,1), start=None, warn=True, visualize=True):
+    def __init__(self, gameState, costFn = search.unitCost, goal=(1,1), start=None, warn=True, visualize=True):
         """
         Stores the start and goal.
 
@@ -270,11 +286,36 @@ def euclideanHeuristic(position, problem, info={}):
 # This portion is incomplete.  Time to write code!  #
 #####################################################
 
+def buildMoveTable(walls):
+    """
+    Numbers the open cells of walls and returns (positions, positionIds,
+    moves): positions[i] is cell i, positionIds maps a cell back to i, and
+    moves[i] lists the (action, next cell id) pairs legal from cell i, in
+    the North, South, East, West order of the other problems.  Problems with
+    packed states step through moves with integer lookups.
+    """
+    positions = walls.asList(False)
+    positionIds = dict((pos, i) for i, pos in enumerate(positions))
+    moves = []
+    for x, y in positions:
+        cellMoves = []
+        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+            dx, dy = Actions.directionToVector(action)
+            nextPos = (int(x + dx), int(y + dy))
+            if nextPos in positionIds:
+                cellMoves.append((action, positionIds[nextPos]))
+        moves.append(cellMoves)
+    return positions, positionIds, moves
+
 class CornersProblem(search.SearchProblem):
     """
     This search problem finds paths through all four corners of a layout.
 
     You must select a suitable state space and successor function
+
+    A state is a packed pair (position id, corner bitmask): the id indexes
+    self.positions (see buildMoveTable) and bit i of the mask is set while
+    self.corners[i] is still unvisited.
     """
 
     def __init__(self, startingGameState: pacman.GameState):
@@ -289,6 +330,12 @@ class CornersProblem(search.SearchProblem):
             if not startingGameState.hasFood(*corner):
                 print('Warning: no food in corner ' + str(corner))
         self._expanded = 0 # DO NOT CHANGE; Number of search nodes expanded
+        self.positions, self.positionIds, self.moves = buildMoveTable(self.walls)
+        # cornerBits[i] is the mask bit of the corner at cell i, or 0
+        self.cornerBits = [0] * len(self.positions)
+        for i, corner in enumerate(self.corners):
+            if corner in self.positionIds:
+                self.cornerBits[self.positionIds[corner]] |= 1 << i
 
     def getStartState(self):
         """
@@ -296,15 +343,14 @@ class CornersProblem(search.SearchProblem):
         space)
         """
         "*** YOUR CODE HERE ***"
-        top, right = self.walls.height-2, self.walls.width-2
-        return (self.startingPosition, True, True, True, True)
+        return (self.positionIds[self.startingPosition], (1 << len(self.corners)) - 1)
 
     def isGoalState(self, state: Any):
         """
         Returns whether this search state is a goal state of the problem.
         """
         "*** YOUR CODE HERE ***"
-        return sum(state[1:]) == 0
+        return state[1] == 0
 
     def getSuccessors(self, state: Any):
         """
@@ -317,28 +363,11 @@ class CornersProblem(search.SearchProblem):
             is the incremental cost of expanding to that successor
         """
 
-        successors = []
-        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-            # Add a successor state to the successor list if the action is legal
-            # Here's a code snippet for figuring out whether a new position hits a wall:
-            #   x,y = currentPosition
-            #   dx, dy = Actions.directionToVector(action)
-            #   nextx, nexty = int(x + dx), int(y + dy)
-            #   hitsWall = self.walls[nextx][nexty]
-
-            "*** YOUR CODE HERE ***"
-            x,y = state[0]
-            dx, dy = Actions.directionToVector(action)
-            nextx, nexty = int(x + dx), int(y + dy)
-            if self.walls[nextx][nexty]:
-                continue
-            next_state = list(state)
-            next_position = (nextx,nexty)
-            next_state[0] = next_position
-            for i in range(len(self.corners)):
-                if next_position == self.corners[i]:
-                    next_state[i+1] = False
-            successors.append((tuple(next_state),action,1))
+        "*** YOUR CODE HERE ***"
+        position, corners = state
+        cornerBits = self.cornerBits
+        successors = [((nextPosition, corners & ~cornerBits[nextPosition]), action, 1)
+                      for action, nextPosition in self.moves[position]]
 
         self._expanded += 1 # DO NOT CHANGE
         return successors
@@ -374,16 +403,17 @@ def cornersHeuristic(state: Any, problem: CornersProblem):
     walls = problem.walls # These are the walls of the maze, as a Grid (game.py)
 
     "*** YOUR CODE HERE ***"
+    position = problem.positions[state[0]]
     state_corners = []
     for i in range(len(corners)):
-        if state[i+1]:
+        if state[1] >> i & 1:
             state_corners.append(corners[i])
     if len(state_corners) == 0:
         return 0
     h_value = 0
     manhattanDistance = lambda a,b: abs(a[0] - b[0]) + abs(a[1] - b[1])
     for corner in state_corners:
-        h_value = max(h_value, manhattanDistance(state[0], corner))
+        h_value = max(h_value, manhattanDistance(position, corner))
     # top, right = walls.height-2, walls.width-2
     # _min = max(top, right) * 2
     # neareast_corner = None
@@ -454,7 +484,7 @@ class FoodSearchProblem:
     def getCostOfActions(self, actions):
         """Returns the cost of a particular sequence of actions.  If those actions
         include an illegal move, return 999999"""
-        x,y= self.getStartState()[0]
+        x,y= self.start[0]
         cost = 0
         for action in actions:
             # figure out the next state and see whether it's legal
@@ -465,6 +495,40 @@ class FoodSearchProblem:
             cost += 1
         return cost
 
+class PackedFoodSearchProblem(FoodSearchProblem):
+    """
+    A FoodSearchProblem whose states are packed pairs (position id, food
+    bitmask): the id indexes self.positions (see buildMoveTable) and bit i
+    of the mask is set while self.foodCells[i], the i-th starting food in
+    Grid.asList order, is uneaten.  Successors take a table lookup and an
+    integer and-not, and states hash as two ints, which is what searches
+    over more than a few dozen dots need.  The food heuristics accept
+    these states as well.
+    """
+    def __init__(self, startingGameState: pacman.GameState):
+        FoodSearchProblem.__init__(self, startingGameState)
+        self.positions, self.positionIds, self.moves = buildMoveTable(self.walls)
+        self.foodCells = self.start[1].asList()
+        # foodBits[i] is the mask bit of the food at cell i, or 0
+        self.foodBits = [0] * len(self.positions)
+        for i, food in enumerate(self.foodCells):
+            self.foodBits[self.positionIds[food]] = 1 << i
+        self.packedStart = (self.positionIds[self.start[0]], (1 << len(self.foodCells)) - 1)
+
+    def getStartState(self):
+        return self.packedStart
+
+    def isGoalState(self, state):
+        return state[1] == 0
+
+    def getSuccessors(self, state):
+        "Returns successor states, the actions they require, and a cost of 1."
+        self._expanded += 1 # DO NOT CHANGE
+        position, food = state
+        foodBits = self.foodBits
+        return [((nextPosition, food & ~foodBits[nextPosition]), action, 1)
+                for action, nextPosition in self.moves[position]]
+
 class AStarFoodSearchAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
     def __init__(self):
@@ -499,21 +563,117 @@ def foodHeuristic(state: Tuple[Tuple, List[List]], problem: FoodSearchProblem):
     Subsequent calls to this heuristic can access
     problem.heuristicInfo['wallCount']
     """
-    position, foodGrid = state
     "*** YOUR CODE HERE ***"
-    foodList = foodGrid.asList()
-    h_value = 0
-    for foodPosition in foodList:
-        h_value = max(h_value, mazeDistance(foodPosition, position, problem.startingGameState))
-    return h_value
+    return max(foodSpanningTreeHeuristic(state, problem), foodFarthestPairHeuristic(state, problem))
+
+def getFoodHeuristicInfo(problem: FoodSearchProblem):
+    """
+    Returns problem.heuristicInfo, filled in on the first call with what the
+    food heuristics share: the layout's maze distances, the starting food
+    cells, the maze distance between every two of them, those pairs sorted
+    from farthest apart to closest, and a cache of per-food-set values.
+    """
+    info = problem.heuristicInfo
+    if 'foodCells' not in info:
+        distances = problem.startingGameState.data.layout.getMazeDistances()
+        foodCells = problem.start[1].asList()
+        foodDistances = [[distances.getDistance(a, b) for b in foodCells] for a in foodCells]
+        foodPairs = [(foodDistances[i][j], i, j)
+                     for i in range(len(foodCells)) for j in range(i + 1, len(foodCells))]
+        foodPairs.sort(reverse=True)
+        info.update({'mazeDistances': distances, 'foodCells': foodCells, 'foodDistances': foodDistances,
+                     'foodPairs': foodPairs, 'foodSets': {}})
+    return info
+
+def getFoodSet(food, info):
+    """
+    Returns (remaining, treeCost) for the food of a state, a food Grid or
+    the mask of a PackedFoodSearchProblem state: the indices into
+    info['foodCells'] of the food left and the weight of a minimum spanning
+    tree over it in maze distance.  Values are cached by food bitmask.
+    """
+    if isinstance(food, int):
+        key = food
+    else:
+        key = food.bits if isinstance(food, BitGrid) else tuple(food.asList())
+    foodSets = info['foodSets']
+    if key not in foodSets:
+        if isinstance(food, int):
+            remaining = [i for i in range(len(info['foodCells'])) if food >> i & 1]
+        else:
+            remaining = [i for i, (x, y) in enumerate(info['foodCells']) if food[x][y]]
+        foodSets[key] = (remaining, spanningTreeCost(remaining, info['foodDistances']))
+    return foodSets[key]
+
+def getFoodStatePosition(state, problem):
+    "Pacman's position in a FoodSearchProblem or PackedFoodSearchProblem state."
+    if isinstance(state[1], int):
+        return problem.positions[state[0]]
+    return state[0]
+
+def spanningTreeCost(nodes, distances):
+    "Weight of a minimum spanning tree over nodes (Prim's algorithm on a distance matrix)."
+    if len(nodes) == 0:
+        return 0
+    linkCosts = dict((node, distances[nodes[0]][node]) for node in nodes[1:])
+    total = 0
+    while linkCosts:
+        node = min(linkCosts, key=linkCosts.get)
+        total += linkCosts.pop(node)
+        row = distances[node]
+        for other in linkCosts:
+            if row[other] < linkCosts[other]:
+                linkCosts[other] = row[other]
+    return total
+
+def foodSpanningTreeHeuristic(state, problem: FoodSearchProblem):
+    """
+    The maze distance to the nearest food plus the weight of a minimum
+    spanning tree over all remaining food.  Any path that eats everything
+    reaches some food first and then connects the rest, so this never
+    overestimates, and it drops by at most 1 per step.
+    """
+    info = getFoodHeuristicInfo(problem)
+    position = getFoodStatePosition(state, problem)
+    remaining, treeCost = getFoodSet(state[1], info)
+    if len(remaining) == 0:
+        return 0
+    distances, foodCells = info['mazeDistances'], info['foodCells']
+    return min([distances.getDistance(position, foodCells[i]) for i in remaining]) + treeCost
+
+def foodFarthestPairHeuristic(state, problem: FoodSearchProblem):
+    """
+    The largest, over two remaining food cells, of the maze distance to the
+    nearer one plus the distance between them: the exact cost of eating just
+    that pair.  Pairs are tried from farthest apart to closest and the scan
+    stops once no later pair can do better.
+    """
+    info = getFoodHeuristicInfo(problem)
+    position = getFoodStatePosition(state, problem)
+    remaining, treeCost = getFoodSet(state[1], info)
+    if len(remaining) == 0:
+        return 0
+    distances, foodCells = info['mazeDistances'], info['foodCells']
+    fromPacman = dict((i, distances.getDistance(position, foodCells[i])) for i in remaining)
+    farthest = max(fromPacman.values())
+    best = farthest
+    for pairDistance, i, j in info['foodPairs']:
+        if pairDistance + farthest <= best:
+            break
+        if i in fromPacman and j in fromPacman:
+            best = max(best, pairDistance + min(fromPacman[i], fromPacman[j]))
+    return best
 
 class ClosestDotSearchAgent(SearchAgent):
     "Search for all food using a sequence of searches"
     def registerInitialState(self, state):
         self.actions = []
         currentState = state
+        # One distance-to-nearest-food field serves every segment; eaten
+        # food is removed from it rather than searched again from scratch.
+        foodField = state.data.layout.getDistanceField(state.getFood().asList())
         while(currentState.getFood().count() > 0):
-            nextPathSegment = self.findPathToClosestDot(currentState) # The missing piece
+            nextPathSegment = self.findPathToClosestDot(currentState, foodField) # The missing piece
             self.actions += nextPathSegment
             for action in nextPathSegment:
                 legal = currentState.getLegalActions()
@@ -521,14 +681,19 @@ class ClosestDotSearchAgent(SearchAgent):
                     t = (str(action), str(currentState))
                     raise Exception('findPathToClosestDot returned an illegal move: %s!\n%s' % t)
                 currentState = currentState.generateSuccessor(0, action)
+                foodField.removeSources([currentState.getPacmanPosition()])
         self.actionIndex = 0
         print('Path found with cost %d.' % len(self.actions))
 
-    def findPathToClosestDot(self, gameState: pacman.GameState):
+    def findPathToClosestDot(self, gameState: pacman.GameState, foodField=None):
         """
         Returns a path (a list of actions) to the closest dot, starting from
-        gameState.
+        gameState.  Given a layout DistanceField over the current food, the
+        path is read off the field instead of found with a new search.
         """
+        if foodField != None:
+            return foodField.getPathToNearest(gameState.getPacmanPosition())
+
         # Here are some useful elements of the startState
         startPosition = gameState.getPacmanPosition()
         food = gameState.getFood()
@@ -561,7 +726,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         # Store info for the PositionSearchProblem (no need to change this)
         self.walls = gameState.getWalls()
         self.startState = gameState.getPacmanPosition()
-        self.costFn = lambda x: 1
+        self.costFn = search.unitCost
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
 
     def isGoalState(self, state: Tuple[int, int]):
@@ -583,11 +748,13 @@ def mazeDistance(point1: Tuple[int, int], point2: Tuple[int, int], gameState: pa
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
     This might be a useful helper function for your ApproximateSearchAgent.
+
+    Distances come from the layout's precomputed MazeDistances index, so
+    each call after the first is a constant-time lookup.
     """
     x1, y1 = point1
     x2, y2 = point2
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return gameState.data.layout.getMazeDistances().getDistance(point1, point2)
@@ -0,0 +1,353 @@
+# searchBenchmark.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Runs search algorithms from search.py on search problems from
+searchAgents.py over the bundled layouts, without any display, and records
+for each run:
+
+  expanded        states passed to getSuccessors, or cells expanded by the
+                  grid solvers in search.py, which skip getSuccessors
+  generated       successors returned by getSuccessors (blank for the grid
+                  solvers)
+  peakFringe      most states generated but not yet expanded at one time
+                  (blank for the grid solvers)
+  heuristicCalls  calls to the heuristic
+  cpuTime         process time of the search (best of --repeat runs)
+  wallTime        wall-clock time of the search (best of --repeat runs)
+  peakMemory      peak bytes allocated during the search (a separate run
+                  under tracemalloc, so it does not slow the timed runs)
+
+along with the cost and length of the returned plan.  Results go to a CSV
+or JSON file, chosen by its extension, and can be compared against an
+earlier result file to catch regressions.
+
+The counts come from one more run on an instrumented problem and heuristic,
+outside the timed runs, which search the bare problem.
+
+Examples:
+  python searchBenchmark.py -o baseline.json
+  python searchBenchmark.py -f astar -p FoodSearchProblem -z foodHeuristic -l trickySearch,tinySearch
+  python searchBenchmark.py -o current.json --compare baseline.json
+"""
+
+import csv
+import inspect
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import layout
+import pacman
+import search
+import searchAgents
+import util
+from pacman import default
+
+FIELDS = ['layout', 'problem', 'algorithm', 'heuristic', 'status', 'cost', 'length',
+          'expanded', 'generated', 'peakFringe', 'heuristicCalls',
+          'cpuTime', 'wallTime', 'peakMemory']
+KEY_FIELDS = ['layout', 'problem', 'algorithm', 'heuristic']
+# Fields that must match exactly between a run and its baseline
+EXACT_FIELDS = ['status', 'cost', 'length', 'expanded', 'generated']
+# The heuristics written for each problem type, run when none are named
+PROBLEM_HEURISTICS = {
+    'PositionSearchProblem': ['nullHeuristic', 'manhattanHeuristic'],
+    'AnyFoodSearchProblem': ['nullHeuristic', 'manhattanHeuristic'],
+    'CornersProblem': ['nullHeuristic', 'cornersHeuristic'],
+    'FoodSearchProblem': ['nullHeuristic', 'foodHeuristic'],
+    'PackedFoodSearchProblem': ['nullHeuristic', 'foodHeuristic'],
+}
+
+class InstrumentedProblem:
+    """
+    Wraps a search problem and counts what the search asks of it.  Every
+    other attribute is passed through, so heuristics that look at
+    problem.walls or problem.heuristicInfo see the wrapped problem's.  The
+    fringe bookkeeping keeps a set of every state seen, so it is only used
+    for the untimed counting run.
+    """
+    def __init__(self, problem):
+        self.problem = problem
+        self.expanded = 0
+        self.generated = 0
+        self.peakFringe = 1
+        self.reached = set([problem.getStartState()])
+        self.closed = set()
+        self.bypassed = False  # Set when a grid solver skips getSuccessors
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+    def getStartState(self):
+        return self.problem.getStartState()
+
+    def isGoalState(self, state):
+        return self.problem.isGoalState(state)
+
+    def getSuccessors(self, state):
+        successors = self.problem.getSuccessors(state)
+        self.expanded += 1
+        self.generated += len(successors)
+        self.closed.add(state)
+        for successor in successors:
+            self.reached.add(successor[0])
+        self.peakFringe = max(self.peakFringe, len(self.reached) - len(self.closed))
+        return successors
+
+    def getCostOfActions(self, actions):
+        return self.problem.getCostOfActions(actions)
+
+    def recordExpansions(self, count):
+        # Called by search.recordGridExpansions for the grid solvers
+        self.expanded += count
+        self.bypassed = True
+        search.recordGridExpansions(self.problem, count)
+
+class CountingHeuristic:
+    "Wraps a heuristic and counts its calls."
+    def __init__(self, heuristic):
+        self.heuristic = heuristic
+        self.calls = 0
+
+    def __call__(self, state, problem=None):
+        self.calls += 1
+        return self.heuristic(state, problem)
+
+def makeProblem(problemType, gameState):
+    """
+    Builds a problem of the given searchAgents type for gameState, turning
+    off warnings and visualization for the problems that have them.
+    """
+    options = {'warn': False, 'visualize': False}
+    parameters = inspect.signature(problemType.__init__).parameters
+    util.mutePrint()  # CornersProblem warns about missing corner food
+    try:
+        return problemType(gameState, **dict((k, v) for k, v in options.items() if k in parameters))
+    finally:
+        util.unmutePrint()
+
+def takesHeuristic(algorithm):
+    return 'heuristic' in inspect.signature(algorithm).parameters
+
+def benchmark(layoutName, problemName, algorithmName, heuristicName, repeat=1, timeout=60, measureMemory=True):
+    """
+    Runs one algorithm on one problem and layout and returns its result
+    row, a dictionary keyed by FIELDS.
+    """
+    row = dict((field, '') for field in FIELDS)
+    row.update({'layout': layoutName, 'problem': problemName,
+                'algorithm': algorithmName, 'heuristic': heuristicName or ''})
+    algorithm = getattr(search, algorithmName)
+    problemType = getattr(searchAgents, problemName)
+    gameState = pacman.GameState()
+    gameState.initialize(layout.getLayout(layoutName), 0)
+
+    def runOnce(instrument=False):
+        # Drop distance indexes so every run pays for the ones it builds
+        layout.MAZE_DISTANCE_CACHE.clear()
+        gameState.data.layout._mazeDistances = None
+        problem = makeProblem(problemType, gameState)
+        heuristic = None
+        if heuristicName:
+            heuristic = util.lookup(heuristicName, dict(vars(searchAgents), **vars(search)))
+        if instrument:
+            problem = InstrumentedProblem(problem)
+            if heuristic != None:
+                heuristic = CountingHeuristic(heuristic)
+        args = [problem]
+        if heuristic != None:
+            args.append(heuristic)
+        startCpu, startWall = time.process_time(), time.perf_counter()
+        actions = util.TimeoutFunction(algorithm, timeout)(*args)
+        cpuTime, wallTime = time.process_time() - startCpu, time.perf_counter() - startWall
+        return problem, heuristic, actions, cpuTime, wallTime
+
+    try:
+        for i in range(repeat):
+            problem, heuristic, actions, cpuTime, wallTime = runOnce()
+            if i == 0 or wallTime < row['wallTime']:
+                row['cpuTime'], row['wallTime'] = cpuTime, wallTime
+        row['status'] = 'ok'
+        row['cost'] = problem.getCostOfActions(actions) if actions != None else ''
+        row['length'] = len(actions) if actions != None else ''
+        problem, heuristic = runOnce(instrument=True)[:2]
+        row['expanded'] = problem.expanded
+        if not problem.bypassed:  # Otherwise unknown: left blank
+            row['generated'] = problem.generated
+            row['peakFringe'] = problem.peakFringe
+        row['heuristicCalls'] = heuristic.calls if heuristic != None else ''
+        if measureMemory:
+            tracemalloc.start()
+            try:
+                runOnce()
+                row['peakMemory'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    except util.TimeoutFunctionException:
+        row['status'] = 'timeout'
+    except Exception as e:
+        row['status'] = 'error: %s' % type(e).__name__
+    return row
+
+def runBenchmarks(layouts, problems, algorithms, heuristics, repeat=1, timeout=60, measureMemory=True, quiet=False):
+    """
+    Benchmarks every algorithm on every problem and layout; algorithms that
+    take a heuristic are run once per heuristic.  If heuristics is empty,
+    each problem type gets its PROBLEM_HEURISTICS.  Returns the result rows.
+    """
+    rows = []
+    for layoutName in layouts:
+        for problemName in problems:
+            for algorithmName in algorithms:
+                heuristicNames = [None]
+                if takesHeuristic(getattr(search, algorithmName)):
+                    heuristicNames = heuristics or PROBLEM_HEURISTICS.get(problemName, ['nullHeuristic'])
+                for heuristicName in heuristicNames:
+                    row = benchmark(layoutName, problemName, algorithmName, heuristicName,
+                                    repeat, timeout, measureMemory)
+                    rows.append(row)
+                    if not quiet:
+                        print('%-18s %-22s %-18s %-20s %-8s expanded %-8s %.3fs' % (
+                            layoutName, problemName, algorithmName, heuristicName or '-',
+                            row['status'], row['expanded'], row['wallTime'] or 0))
+    return rows
+
+def writeResults(rows, path):
+    if path.endswith('.json'):
+        f = open(path, 'w')
+        try:
+            json.dump(rows, f, indent=1)
+        finally:
+            f.close()
+    else:
+        f = open(path, 'w', newline='')
+        try:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        finally:
+            f.close()
+
+def readResults(path):
+    f = open(path, newline='' if not path.endswith('.json') else None)
+    try:
+        if path.endswith('.json'):
+            return json.load(f)
+        rows = []
+        for row in csv.DictReader(f):
+            for field in FIELDS:
+                if field not in KEY_FIELDS and field != 'status' and row[field] != '':
+                    row[field] = float(row[field])
+            rows.append(row)
+        return rows
+    finally:
+        f.close()
+
+def compareResults(rows, baselineRows, tolerance=0.2, minTime=0.01):
+    """
+    Compares result rows against baseline rows for the same layout,
+    problem, algorithm and heuristic.  A row regresses if any EXACT_FIELDS
+    value differs, or if its wall time exceeds the baseline's by more than
+    the tolerance fraction (times under minTime seconds are noise and are
+    not compared).  Returns a list of messages, one per regression.
+    """
+    baseline = dict((tuple(row[k] for k in KEY_FIELDS), row) for row in baselineRows)
+    messages = []
+    for row in rows:
+        key = tuple(row[k] for k in KEY_FIELDS)
+        if key not in baseline:
+            continue
+        old = baseline[key]
+        name = '/'.join([k for k in key if k])
+        for field in EXACT_FIELDS:
+            if str(row[field]) != str(old[field]) and not (row[field] != '' and old[field] != ''
+                                                      and float(row[field]) == float(old[field])):
+                messages.append('%s: %s changed from %s to %s' % (name, field, old[field], row[field]))
+        if row['wallTime'] != '' and old['wallTime'] != '' and \
+                max(row['wallTime'], old['wallTime']) >= minTime and \
+                row['wallTime'] > old['wallTime'] * (1 + tolerance):
+            messages.append('%s: wallTime rose from %.4fs to %.4fs' % (name, old['wallTime'], row['wallTime']))
+    return messages
+
+def readCommand(argv):
+    """
+    Processes the command used to run the benchmarks from the command line.
+    """
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python searchBenchmark.py <options>
+    EXAMPLES:   (1) python searchBenchmark.py -o baseline.csv
+                    - benchmarks the default algorithms on every layout
+                (2) python searchBenchmark.py -o new.json --compare baseline.csv
+                    - benchmarks and reports regressions against a baseline
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layouts', dest='layouts',
+                      help=default('comma-separated LAYOUTS to run on; all of layouts/ if empty'),
+                      metavar='LAYOUTS', default='')
+    parser.add_option('-p', '--problems', dest='problems',
+                      help=default('comma-separated problem TYPES from searchAgents'),
+                      metavar='TYPES', default='PositionSearchProblem,CornersProblem,FoodSearchProblem')
+    parser.add_option('-f', '--algorithms', dest='algorithms',
+                      help=default('comma-separated search FUNCTIONS from search'),
+                      metavar='FUNCTIONS', default='bfs,ucs,astar')
+    parser.add_option('-z', '--heuristics', dest='heuristics',
+                      help='comma-separated HEURISTICS for algorithms that take one; '
+                           'by default each problem\'s own heuristic and nullHeuristic',
+                      metavar='HEURISTICS', default='')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int',
+                      help=default('timed runs per benchmark; the fastest is kept'), default=1)
+    parser.add_option('-t', '--timeout', dest='timeout', type='int',
+                      help=default('seconds before a single run is abandoned'), default=60)
+    parser.add_option('--noMemory', dest='measureMemory', action='store_false',
+                      help='Skip the extra tracemalloc run that measures peak memory', default=True)
+    parser.add_option('-o', '--output', dest='output',
+                      help='FILE to write results to (.json for JSON, CSV otherwise)', metavar='FILE', default=None)
+    parser.add_option('-c', '--compare', dest='compare',
+                      help='Results FILE to compare against', metavar='FILE', default=None)
+    parser.add_option('--tolerance', dest='tolerance', type='float',
+                      help=default('fraction by which wall time may grow before it counts as a regression'),
+                      default=0.2)
+    parser.add_option('-q', '--quiet', dest='quiet', action='store_true',
+                      help='Print only the regression report', default=False)
+
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+
+    if options.layouts:
+        options.layouts = options.layouts.split(',')
+    else:
+        layoutDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts')
+        options.layouts = sorted(name[:-len('.lay')] for name in os.listdir(layoutDir) if name.endswith('.lay'))
+    options.problems = options.problems.split(',')
+    options.algorithms = options.algorithms.split(',')
+    options.heuristics = options.heuristics.split(',') if options.heuristics else []
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    rows = runBenchmarks(options.layouts, options.problems, options.algorithms, options.heuristics,
+                         options.repeat, options.timeout, options.measureMemory, options.quiet)
+    if options.output:
+        writeResults(rows, options.output)
+    if options.compare:
+        messages = compareResults(rows, readResults(options.compare), options.tolerance)
+        for message in messages:
+            print(message)
+        print('%d regression(s) against %s' % (len(messages), options.compare))
+        sys.exit(1 if messages else 0)
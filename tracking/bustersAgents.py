@@ -150,13 +150,15 @@ class GreedyBustersAgent(BustersAgent):
              if livingGhosts[i+1]]
         "*** YOUR CODE HERE ***"
         livingGhostPositions = [ghostDistribution.argMax() for ghostDistribution in livingGhostPositionDistributions]
+        successorPositions = [Actions.getSuccessor(pacmanPosition, action) for action in legal]
+        # One batched lookup per ghost covers every successor position.
+        ghostDistances = [self.distancer.getDistancesTo(livingGhostPosition, successorPositions)
+                          for livingGhostPosition in livingGhostPositions]
         minDistance = float('inf')
-        for action in legal:
-            successorPosition = Actions.getSuccessor(pacmanPosition, action)
-            for livingGhostPosition in livingGhostPositions:
-                distance = self.distancer.getDistance(successorPosition, livingGhostPosition)
-                if distance < minDistance:
-                    minDistance = distance
+        for i, action in enumerate(legal):
+            for distances in ghostDistances:
+                if distances[i] < minDistance:
+                    minDistance = distances[i]
                     bestAction = action
         return bestAction
         "*** END YOUR CODE HERE ***"
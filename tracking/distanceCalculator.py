@@ -74,12 +74,22 @@ class Distancer:
           bestDistance = distance
     return bestDistance
 
+  def getDistancesTo(self, source, targets):
+    """
+    Returns the distances from source to each of targets, in order.  When
+    every position is a grid cell, they are read off one row of the maze
+    distance index in a single call.
+    """
+    mazeDistances = self._distances
+    if mazeDistances == None or not all(isInt(pos) and pos in mazeDistances for pos in [source] + list(targets)):
+      return [self.getDistance(source, target) for target in targets]
+    return [min(distance, UNREACHABLE_DISTANCE) for distance in mazeDistances.getDistancesTo(source, targets)]
+
   def getDistanceOnGrid(self, pos1, pos2):
-    key = (pos1, pos2)
-    if key in self._distances:
-      return self._distances[key]
+    if pos1 in self._distances and pos2 in self._distances:
+      return min(self._distances.getDistance(pos1, pos2), UNREACHABLE_DISTANCE)
     else:
-      raise Exception("Positions not in grid: " + str(key))
+      raise Exception("Positions not in grid: " + str((pos1, pos2)))
 
   def isReadyForMazeDistance(self):
     return self._distances != None
@@ -109,6 +119,8 @@ def getGrids1D(x):
 ##########################################
 
 distanceMap = {}
+# The distance reported between cells in unconnected parts of the maze
+UNREACHABLE_DISTANCE = 1000000000
 distanceMapSemaphore = threading.Semaphore(1)
 distanceThread = None
 
@@ -131,7 +143,7 @@ class DistanceCalculator(threading.Thread):
       if distanceThread != None: raise Exception('Multiple distance threads')
       distanceThread = self
 
-      distances = computeDistances(self.layout)
+      distances = self.layout.getMazeDistances()
       print('[Distancer]: Switching to maze distances',file=sys.stdout)
 
       distanceMap[self.layout.walls] = distances
@@ -143,43 +155,16 @@ class DistanceCalculator(threading.Thread):
     self.distancer._distances = distances
 
 def computeDistances(layout):
+    """
+    Returns a dictionary of maze distances keyed by (target, source) pairs,
+    read off the layout's MazeDistances index.
+    """
     distances = {}
-    allNodes = layout.walls.asList(False)
-    for source in allNodes:
-        dist = {}
-        closed = {}
-        for node in allNodes:
-            dist[node] = 1000000000
-        import util
-        queue = util.PriorityQueue()
-        queue.push(source, 0)
-        dist[source] = 0
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
-                continue
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
-            if not layout.isWall((x,y+1)):
-                adjacent.append((x,y+1))
-            if not layout.isWall((x,y-1)):
-                adjacent.append((x,y-1) )
-            if not layout.isWall((x+1,y)):
-                adjacent.append((x+1,y) )
-            if not layout.isWall((x-1,y)):
-                adjacent.append((x-1,y))
-            for other in adjacent:
-                if not other in dist:
-                    continue
-                oldDist = dist[other]
-                newDist = nodeDist+1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
+    mazeDistances = layout.getMazeDistances()
+    for source in mazeDistances.positions:
+        for target in mazeDistances.positions:
+            distance = mazeDistances.getDistance(target, source)
+            distances[(target, source)] = min(distance, UNREACHABLE_DISTANCE)
     return distances
 
 
@@ -22,6 +22,7 @@
 
 from util import *
 import time, os
+import random
 import traceback
 import sys
 
@@ -193,15 +194,17 @@ class Grid:
         return self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
+        # The Zobrist hash of the set cells, as for a BitGrid: the two
+        # compare equal when they hold the same cells, so they must hash
+        # alike.  Cell (x,y) is index x * height + y.
         h = 0
+        index = 0
         for l in self.data:
             for i in l:
                 if i:
-                    h += base
-                base *= 2
-        return hash(h)
+                    h ^= zobristKey(index)
+                index += 1
+        return h
 
     def copy(self):
         g = Grid(self.width, self.height)
@@ -246,7 +249,7 @@ class Grid:
         return tuple(bits)
 
     def _cellIndexToPosition(self, index):
-        x = index / self.height
+        x = index // self.height
         y = index % self.height
         return x, y
 
@@ -274,6 +277,182 @@ class Grid:
                 bools.append(False)
         return bools
 
+# Zobrist hashing: every feature of a state that takes part in equality (a
+# food cell, a capsule, an agent's configuration or scared timer) gets a random
+# 64-bit key, and a state hashes to the XOR of the keys of its features.  A
+# move then only has to XOR out the keys of what changed and XOR in the new ones.
+_zobristRandom = random.Random(188)
+_zobristKeys = {}
+
+def zobristKey(feature):
+    """
+    Returns the random 64-bit key of a hashable state feature.  Keys are drawn
+    lazily from a private generator so that seeded games are not disturbed.
+    Features must come from a bounded set (cells, positions, timers); keys
+    for unbounded values such as the score come from mixKey instead.
+    """
+    key = _zobristKeys.get(feature)
+    if key is None:
+        key = _zobristKeys[feature] = _zobristRandom.getrandbits(64)
+    return key
+
+_MASK64 = (1 << 64) - 1
+
+def mixKey(value):
+    """
+    Returns a 64-bit key computed from an int (the splitmix64 finalizer), so
+    that no table grows with the number of distinct values.
+    """
+    z = (value * 0x9E3779B97F4A7C15 + 0x632BE59BD9B4E019) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+class BitGrid(Grid):
+    """
+    A boolean Grid backed by a single Python int, one bit per cell.  Cell (x,y)
+    is bit x * height + y, the same ordering used by packBits and __hash__.
+
+    Data is still accessed via grid[x][y]; grid[x] returns a small column view
+    that reads and writes bits of the parent grid.  Because ints are immutable,
+    copy() is O(1) and the copies share nothing that can be mutated
+    (copy-on-write for free) and count() is a popcount.  The hash is the
+    Zobrist hash of the set cells, updated on every write, so hashing is O(1).
+    Used for the food grid, which is copied on every pellet eaten and on every
+    FoodSearchProblem successor.
+    """
+    def __init__(self, width, height, initialValue=False, bitRepresentation=None):
+        if initialValue not in [False, True]:
+            raise Exception('Grids can only contain booleans')
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        self.bits = 0
+        self._zobrist = 0
+        if initialValue:
+            self.bits = (1 << (width * height)) - 1
+            for index in range(width * height):
+                self._zobrist ^= zobristKey(index)
+        if bitRepresentation:
+            self._unpackBits(bitRepresentation)
+
+    def fromBits(width, height, bits):
+        "Builds a BitGrid from the value of another BitGrid's bits."
+        g = BitGrid(width, height)
+        g.bits = bits
+        while bits:
+            low = bits & -bits
+            g._zobrist ^= zobristKey(low.bit_length() - 1)
+            bits ^= low
+        return g
+    fromBits = staticmethod(fromBits)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.width
+        if i < 0 or i >= self.width:
+            raise IndexError('grid index out of range')
+        return _BitGridColumn(self, i * self.height)
+
+    def __setitem__(self, key, item):
+        column = self[key]
+        for y, value in enumerate(item):
+            column[y] = value
+
+    def _get(self, index):
+        return (self.bits >> index) & 1 == 1
+
+    def _set(self, index, value):
+        if value not in [False, True]:
+            raise Exception('Grids can only contain booleans')
+        mask = 1 << index
+        bits = self.bits | mask if value else self.bits & ~mask
+        if bits != self.bits:
+            self.bits = bits
+            self._zobrist ^= zobristKey(index)
+
+    @property
+    def data(self):
+        "A list of lists snapshot of the grid, for code that expects a Grid."
+        return [[self._get(x * self.height + y) for y in range(self.height)]
+                for x in range(self.width)]
+
+    def __str__(self):
+        out = [[str(self._get(x * self.height + y))[0] for x in range(self.width)]
+               for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other == None:
+            return False
+        if isinstance(other, BitGrid):
+            return self.bits == other.bits and self.width == other.width and self.height == other.height
+        return self.data == other.data
+
+    def __hash__(self):
+        return self._zobrist
+
+    def copy(self):
+        g = BitGrid.__new__(BitGrid)
+        g.CELLS_PER_INT = self.CELLS_PER_INT
+        g.width = self.width
+        g.height = self.height
+        g.bits = self.bits
+        g._zobrist = self._zobrist
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        return self.copy()
+
+    def count(self, item=True):
+        ones = bin(self.bits).count('1')
+        if item:
+            return ones
+        return self.width * self.height - ones
+
+    def asList(self, key=True):
+        bits = self.bits
+        if not key:
+            bits = ~bits & ((1 << (self.width * self.height)) - 1)
+        list = []
+        height = self.height
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            list.append((index // height, index % height))
+            bits ^= low
+        return list
+
+class _BitGridColumn:
+    "A view of one column of a BitGrid, so that grid[x][y] keeps working."
+    __slots__ = ('grid', 'offset')
+
+    def __init__(self, grid, offset):
+        self.grid = grid
+        self.offset = offset
+
+    def __len__(self):
+        return self.grid.height
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.grid.height
+        if y < 0 or y >= self.grid.height:
+            raise IndexError('grid index out of range')
+        return (self.grid.bits >> (self.offset + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        if y < 0:
+            y += self.grid.height
+        if y < 0 or y >= self.grid.height:
+            raise IndexError('grid index out of range')
+        self.grid._set(self.offset + y, value)
+
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
         return bitRep
@@ -391,6 +570,7 @@ class GameStateData:
         self._lose = False
         self._win = False
         self.scoreChange = 0
+        self._hash = None
 
     def deepCopy( self ):
         state = GameStateData( self )
@@ -414,23 +594,74 @@ class GameStateData:
         """
         if other == None: return False
         # TODO Check for type of other
+        if hash(self) != hash(other): return False
         if not self.agentStates == other.agentStates: return False
         if not self.food == other.food: return False
         if not self.capsules == other.capsules: return False
         if not self.score == other.score: return False
         return True
 
-    def __hash__( self ):
+    def __hash__(self):
         """
         Allows states to be keys of dictionaries.
+
+        The hash is the XOR of the Zobrist keys of the state's features (see
+        zobristKey), the score included.  It is computed once and cached; code
+        that edits a hashed state in place must call clearHash afterwards.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        if self._hash is None:
+            h = hash(self.food) ^ self._scoreKey(self.score)
+            for agentIndex in range(len(self.agentStates)):
+                h ^= self._agentKey(agentIndex)
+            for capsule in self.capsules:
+                h ^= zobristKey(('capsule', capsule))
+            self._hash = h
+        return self._hash
+
+    def clearHash(self):
+        "Drops the cached hash after an in-place edit of the state."
+        self._hash = None
+
+    def _agentKey(self, agentIndex):
+        agentState = self.agentStates[agentIndex]
+        configuration = agentState.configuration
+        if configuration == None:
+            key = zobristKey(('agent', agentIndex, None, None))
+        else:
+            key = zobristKey(('agent', agentIndex, configuration.pos, configuration.direction))
+        return key ^ zobristKey(('scared', agentIndex, agentState.scaredTimer))
+
+    def _scoreKey(self, score):
+        # Not hash(score): hash(-1) == hash(-2).  Whole float scores use the
+        # key of the equal int.
+        if isinstance(score, float) and score.is_integer():
+            score = int(score)
+        if not isinstance(score, int):
+            score = hash(score)
+        return mixKey(score)
+
+    def deriveHash(self, prevState, agentIndex):
+        """
+        Sets the hash of a state generated from prevState by a move of
+        agentIndex, starting from prevState's hash and replacing the keys of
+        the features that changed.  The food grid keeps its own hash up to
+        date as pellets are eaten.  Does nothing if prevState was never
+        hashed; the hash is then computed from scratch on demand.
+        """
+        if prevState._hash == None:
+            return
+        h = prevState._hash ^ hash(prevState.food) ^ hash(self.food)
+        h ^= self._scoreKey(prevState.score) ^ self._scoreKey(self.score)
+        if self._capsuleEaten != None:
+            h ^= zobristKey(('capsule', self._capsuleEaten))
+        if self._capsuleEaten != None or True in self._eaten:
+            # Scared timers were reset or a ghost was sent home
+            changed = range(len(self.agentStates))
+        else:
+            changed = [agentIndex]
+        for index in changed:
+            h ^= prevState._agentKey(index) ^ self._agentKey(index)
+        self._hash = h
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
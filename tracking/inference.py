@@ -14,6 +14,9 @@
 
 import random
 import itertools
+import array
+import bisect
+import collections
 from typing import List, Dict, Tuple
 import busters
 import game
@@ -364,15 +367,58 @@ class DiscreteDistribution(dict):
         0.0
         """
         "*** YOUR CODE HERE ***"
-        total = self.total()
-        rand = random.random()
-        currentSum = 0
-        for key in self.keys():
-            currentSum += self[key]
-            if rand < currentSum / total:
-                return key
+        return sampleFromTable(self.getSampleTable())
         "*** END YOUR CODE HERE ***"
 
+    def getSampleTable(self):
+        """
+        Return (keys, cdf): the keys in order and the running sums of their
+        values divided by the total.  The table is a snapshot owned by the
+        caller; it does not follow later changes to the distribution.  A
+        distribution whose values sum to 0 gives an empty table.
+        """
+        total = self.total()
+        if total == 0:
+            return [], []
+        keys = list(self.keys())
+        cdf = [currentSum / total for currentSum in itertools.accumulate(self.values())]
+        return keys, cdf
+
+    def sampleN(self, n):
+        """
+        Draw n independent samples from the distribution and return their
+        keys.  The sample table is built once and each draw is a binary
+        search of it.
+
+        >>> dist = DiscreteDistribution()
+        >>> dist['a'] = 1
+        >>> dist['b'] = 4
+        >>> samples = dist.sampleN(100000)
+        >>> round(samples.count('b') * 1.0/len(samples), 1)
+        0.8
+        """
+        return sampleFromTable(self.getSampleTable(), n)
+
+
+def sampleFromTable(table, n=None):
+    """
+    Draw from a (keys, cdf) table built by DiscreteDistribution.getSampleTable.
+    Returns one key, or a list of n keys when n is given.  An empty table
+    gives None for every draw, so sample returns None for a distribution
+    with nothing to draw.
+    """
+    keys, cdf = table
+    if len(keys) == 0:
+        return None if n == None else [None] * n
+    last = len(keys) - 1
+    if n == None:
+        return keys[min(bisect.bisect_right(cdf, random.random()), last)]
+    return [keys[min(bisect.bisect_right(cdf, random.random()), last)] for _ in range(n)]
+
+
+# The number of Pacman positions whose transition rows an inference module
+# keeps (see InferenceModule.getTransitionRows)
+TRANSITION_CACHE_SIZE = 256
 
 class InferenceModule:
     """
@@ -471,6 +517,7 @@ class InferenceModule:
         """
         conf = game.Configuration(ghostPosition, game.Directions.STOP)
         gameState.data.agentStates[index] = game.AgentState(conf, False)
+        gameState.data.clearHash()
         return gameState
 
     def setGhostPositions(self, gameState, ghostPositions):
@@ -480,6 +527,7 @@ class InferenceModule:
         for index, pos in enumerate(ghostPositions):
             conf = game.Configuration(pos, game.Directions.STOP)
             gameState.data.agentStates[index + 1] = game.AgentState(conf, False)
+        gameState.data.clearHash()
         return gameState
 
     def observe(self, gameState):
@@ -498,8 +546,93 @@ class InferenceModule:
         """
         self.legalPositions = [p for p in gameState.getWalls().asList(False) if p[1] > 1]
         self.allPositions = self.legalPositions + [self.getJailPosition()]
+        self.positions = []
+        self.positionIds = {}
+        self.transitionCache = collections.OrderedDict()
+        self.likelihoodCache = {}
+        for pos in self.allPositions:
+            self.getPositionId(pos)
         self.initializeUniformly(gameState)
 
+    def getPositionId(self, pos):
+        """
+        Returns the index of pos in self.positions, which starts out as
+        self.allPositions; positions outside it get an index the first time
+        they turn up.  Array-based modules index their beliefs this way.
+        """
+        if pos not in self.positionIds:
+            self.positionIds[pos] = len(self.positions)
+            self.positions.append(pos)
+            self.likelihoodCache = {}
+        return self.positionIds[pos]
+
+    def getTransitionRows(self, gameState, positionIds):
+        """
+        Returns a dictionary holding, for each id in positionIds, the sparse
+        row of the transition model from that position: a list of
+        (j, P(positions[j] | positions[id])) pairs.  The model only depends
+        on where Pacman is and on the kind of ghost, so rows are cached per
+        (Pacman position, ghost agent type) and are only computed, with
+        getPositionDistribution, the first time they are asked for.  The
+        cache keeps the TRANSITION_CACHE_SIZE most recently used Pacman
+        positions and is reset for each game by initialize.
+        """
+        rows, cdfs = self.getTransitionCacheEntry(gameState)
+        for i in positionIds:
+            if i not in rows:
+                newPosDist = self.getPositionDistribution(gameState, self.positions[i])
+                rows[i] = [(self.getPositionId(p), prob) for p, prob in newPosDist.items()]
+        return rows
+
+    def getTransitionCdfs(self, gameState, positionIds):
+        """
+        Returns a dictionary holding, for each id in positionIds, the row of
+        getTransitionRows as (successor ids, running sums of their
+        probabilities), ready for sampling by bisection.  They are cached
+        alongside the rows they are built from.
+        """
+        rows, cdfs = self.getTransitionCacheEntry(gameState)
+        missing = [i for i in positionIds if i not in cdfs]
+        if missing:
+            self.getTransitionRows(gameState, missing)
+            for i in missing:
+                cdfs[i] = ([j for j, prob in rows[i]],
+                           list(itertools.accumulate(prob for j, prob in rows[i])))
+        return cdfs
+
+    def getTransitionCacheEntry(self, gameState):
+        # The (rows, cdfs) dictionaries cached for gameState's Pacman position
+        key = (gameState.getPacmanPosition(), type(self.ghostAgent))
+        cache = self.transitionCache
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            cache[key] = ({}, {})
+            if len(cache) > TRANSITION_CACHE_SIZE:
+                cache.popitem(last=False)
+        return cache[key]
+
+    def getObservationLikelihoods(self, observation, pacmanPosition):
+        """
+        Returns the list of P(observation | ghost position) over
+        self.positions, with the same jail handling as getObservationProb.
+        The lists are cached per noisy distance and Pacman position.
+        """
+        key = (observation, pacmanPosition)
+        if key not in self.likelihoodCache:
+            jailPosition = self.getJailPosition()
+            likelihoods = []
+            for pos in self.positions:
+                if observation == None:
+                    likelihoods.append(float(pos == jailPosition))
+                elif pos == jailPosition:
+                    likelihoods.append(0.0)
+                else:
+                    trueDistance = manhattanDistance(pacmanPosition, pos)
+                    likelihoods.append(busters.getObservationProbability(observation, trueDistance))
+            self.likelihoodCache[key] = likelihoods
+        return self.likelihoodCache[key]
+
     #########################
     # #############
     # Methods that need to be overridden #
@@ -613,6 +746,47 @@ class ExactInference(InferenceModule):
         return self.beliefs
 
 
+class SparseExactInference(ExactInference):
+    """
+    Exact inference that runs the forward algorithm on a belief vector
+    indexed like self.positions instead of on dictionaries.
+
+    The transition model is a sparse matrix whose rows come from
+    getTransitionRows, cached per Pacman position and ghost type, and
+    observation likelihoods come from the cached table of
+    getObservationLikelihoods.  Each time step is then one sparse
+    matrix-vector product and one elementwise product.
+    """
+    def initializeUniformly(self, gameState):
+        self.beliefVector = [0.0] * len(self.positions)
+        for pos in self.legalPositions:
+            self.beliefVector[self.positionIds[pos]] = 1.0 / len(self.legalPositions)
+
+    def observeUpdate(self, observation: int, gameState: busters.GameState):
+        likelihoods = self.getObservationLikelihoods(observation, gameState.getPacmanPosition())
+        beliefs = [belief * likelihood for belief, likelihood in zip(self.beliefVector, likelihoods)]
+        total = float(sum(beliefs))
+        if total != 0:
+            beliefs = [belief / total for belief in beliefs]
+        self.beliefVector = beliefs
+
+    def elapseTime(self, gameState: busters.GameState):
+        occupied = [i for i, belief in enumerate(self.beliefVector) if belief != 0]
+        rows = self.getTransitionRows(gameState, occupied)
+        newBeliefs = [0.0] * len(self.positions)
+        for i in occupied:
+            belief = self.beliefVector[i]
+            for j, prob in rows[i]:
+                newBeliefs[j] += belief * prob
+        self.beliefVector = newBeliefs
+
+    def getBeliefDistribution(self):
+        beliefs = DiscreteDistribution()
+        for pos, belief in zip(self.positions, self.beliefVector):
+            beliefs[pos] = belief
+        return beliefs
+
+
 class ParticleFilter(InferenceModule):
     """
     A particle filter for approximately tracking a single ghost.
@@ -685,7 +859,7 @@ class ParticleFilter(InferenceModule):
         if weight.total() == 0:
             self.initializeUniformly(gameState)
         else:
-            self.particles = [weight.sample() for _ in range(self.numParticles)]
+            self.particles = weight.sampleN(self.numParticles)
         "*** END YOUR CODE HERE ***"
     
     ########### ########### ###########
@@ -704,3 +878,91 @@ class ParticleFilter(InferenceModule):
             newParticles.append(newPosDist.sample())
         self.particles = newParticles
         "*** END YOUR CODE HERE ***"
+
+
+class ArrayParticleFilter(ParticleFilter):
+    """
+    A particle filter that stores its particles as an array of position ids
+    (see getPositionId), for tracking with many thousands of particles.
+
+    Particles are weighted with the cached likelihood table of
+    getObservationLikelihoods and resampled in O(numParticles) with
+    systematic (or stratified) resampling.  Time passes by grouping the
+    particles by cell and drawing each group's successors from that cell's
+    cached cumulative transition row (see getTransitionCdfs).
+    """
+    def __init__(self, ghostAgent, numParticles=300, resampling='systematic'):
+        ParticleFilter.__init__(self, ghostAgent, numParticles)
+        if resampling not in ('systematic', 'stratified'):
+            raise Exception('Unknown resampling scheme: ' + str(resampling))
+        self.resampling = resampling
+
+    def initializeUniformly(self, gameState):
+        legalIds = [self.positionIds[pos] for pos in self.legalPositions]
+        self.particleIds = array.array('i', [legalIds[i % len(legalIds)]
+                                             for i in range(self.numParticles)])
+
+    def getBeliefDistribution(self):
+        beliefDistribution = DiscreteDistribution()
+        for i, count in self.getParticleCounts().items():
+            beliefDistribution[self.positions[i]] = count / self.numParticles
+        return beliefDistribution
+
+    def getParticleCounts(self):
+        """
+        Returns a dictionary from position id to the number of particles there.
+        """
+        counts = {}
+        for i in self.particleIds:
+            counts[i] = counts.get(i, 0) + 1
+        return counts
+
+    def observeUpdate(self, observation: int, gameState: busters.GameState):
+        likelihoods = self.getObservationLikelihoods(observation, gameState.getPacmanPosition())
+        counts = self.getParticleCounts()
+        cells = list(counts.keys())
+        weights = [counts[i] * likelihoods[i] for i in cells]
+        if sum(weights) == 0:
+            self.initializeUniformly(gameState)
+        else:
+            self.particleIds = self.resample(cells, weights)
+
+    def resample(self, cells, weights):
+        """
+        Returns numParticles particle ids drawn from cells in proportion to
+        their weights, in one pass.  Systematic resampling places the draws a
+        uniform step apart from a single random offset, so each cell gets
+        within one particle of its expected count.  Stratified resampling
+        draws a fresh offset within each step, so only each draw stays
+        within its own step; a cell's count can stray further, though less
+        than with independent draws.
+        """
+        numParticles = self.numParticles
+        step = float(sum(weights)) / numParticles
+        offset = random.random()
+        resampled = array.array('i')
+        cumulative = 0.0
+        for particle, weight in zip(cells, weights):
+            if weight == 0:
+                continue
+            cumulative += weight
+            while len(resampled) < numParticles and (len(resampled) + offset) * step < cumulative:
+                resampled.append(particle)
+                if self.resampling == 'stratified':
+                    offset = random.random()
+            lastParticle = particle
+        # Rounding can leave the last draw just past the final cumulative weight
+        while len(resampled) < numParticles:
+            resampled.append(lastParticle)
+        return resampled
+
+    def elapseTime(self, gameState):
+        groups = self.getParticleCounts()
+        cdfs = self.getTransitionCdfs(gameState, list(groups.keys()))
+        newParticleIds = array.array('i')
+        for i, count in groups.items():
+            successors, cumulative = cdfs[i]
+            total = cumulative[-1]
+            for _ in range(count):
+                newParticleIds.append(successors[bisect.bisect_right(cumulative, random.random() * total)])
+        self.particleIds = newParticleIds
@@ -29,6 +29,8 @@
 import sys
 import inspect
 import heapq, random
+import bisect
+import itertools
 import io
 
 
@@ -206,6 +208,72 @@ class PriorityQueue:
         else:
             self.push(item, priority)
 
+class IndexedPriorityQueue(PriorityQueue):
+    """
+    A priority queue that holds each item at most once and supports
+    O(log n) update, remove and membership tests.  An item -> heap entry
+    map finds an item's entry; a removed or re-prioritized entry is marked
+    dead and skipped when it reaches the top (lazy deletion).  Items must
+    be hashable.  Items come out in the same order PriorityQueue would give
+    for the same calls: by priority, then by when they were pushed.
+    """
+    def __init__(self):
+        PriorityQueue.__init__(self)
+        self.entries = {}
+
+    def push(self, item, priority):
+        """
+        Adds item with the given priority.  An item that is already queued
+        is moved to the new priority as though it had just been pushed.
+        """
+        # Inlined remove and pushEntry: this is the A* fringe's hot path
+        entries = self.entries
+        if item in entries:
+            entries.pop(item)[3] = False
+        entry = [priority, self.count, item, True]
+        entries[item] = entry
+        heapq.heappush(self.heap, entry)
+        self.count += 1
+
+    def pushEntry(self, item, priority, count):
+        entry = [priority, count, item, True]
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        heap = self.heap
+        while True:
+            priority, count, item, alive = heapq.heappop(heap)
+            if alive:
+                del self.entries[item]
+                return item
+
+    def isEmpty(self):
+        return len(self.entries) == 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    def getPriority(self, item):
+        return self.entries[item][0]
+
+    def remove(self, item):
+        entry = self.entries.pop(item)
+        entry[3] = False
+
+    def update(self, item, priority):
+        # Same contract as PriorityQueue.update: only ever lowers a queued
+        # item's priority, keeping its place among equal priorities.
+        if item not in self.entries:
+            self.push(item, priority)
+        elif priority < self.entries[item][0]:
+            count = self.entries[item][1]
+            self.remove(item)
+            self.pushEntry(item, priority, count)
+
 class PriorityQueueWithFunction(PriorityQueue):
     """
     Implements a priority queue with the same push/pop signature of the
@@ -277,6 +345,37 @@ class Counter(dict):
         self.setdefault(idx, 0)
         return dict.__getitem__(self, idx)
 
+    def getSampleTable(self):
+        """
+        Returns (keys, cdf): the keys in sorted order and the running sums
+        of their normalized counts, the table util.sample walks.  The table
+        is a snapshot owned by the caller; it does not follow later changes
+        to the counter.  Pass it to sampleFromTable for repeated draws.
+        """
+        items = sorted(self.items())
+        total = float(sum([value for key, value in items]))
+        if total == 0:
+            raise Exception('Cannot sample from a counter whose counts sum to 0')
+        keys = [key for key, value in items]
+        cdf = list(itertools.accumulate([value / total for key, value in items]))
+        return keys, cdf
+
+    def sampleN(self, n):
+        """
+        Returns a list of n keys drawn independently with probability
+        proportional to their counts.  The sample table is built once per
+        call and each draw is a binary search of it, picking what util.sample
+        would for the same random number.
+
+        >>> a = Counter()
+        >>> a['x'] = 1
+        >>> a['y'] = 3
+        >>> draws = a.sampleN(10000)
+        >>> len(draws), sorted(set(draws))
+        (10000, ['x', 'y'])
+        """
+        return sampleFromTable(self.getSampleTable(), n)
+
     def incrementAll(self, keys, count):
         """
         Increments all elements of keys by the same count.
@@ -491,9 +590,7 @@ def nSample(distribution, values, n):
 
 def sample(distribution, values = None):
     if type(distribution) == Counter:
-        items = sorted(distribution.items())
-        distribution = [i[1] for i in items]
-        values = [i[0] for i in items]
+        return sampleFromTable(distribution.getSampleTable())
     if sum(distribution) != 1:
         distribution = normalize(distribution)
     choice = random.random()
@@ -504,8 +601,20 @@ def sample(distribution, values = None):
     return values[i]
 
 def sampleFromCounter(ctr):
-    items = sorted(ctr.items())
-    return sample([v for k,v in items], [k for k,v in items])
+    return sampleFromTable(ctr.getSampleTable())
+
+def sampleFromTable(table, n=None):
+    """
+    Draws from a (keys, cdf) table built by Counter.getSampleTable.  Returns
+    one key, or a list of n keys when n is given.
+    """
+    keys, cdf = table
+    if len(keys) == 0:
+        raise Exception('Cannot sample from an empty table')
+    last = len(keys) - 1
+    if n == None:
+        return keys[min(bisect.bisect_left(cdf, random.random()), last)]
+    return [keys[min(bisect.bisect_left(cdf, random.random()), last)] for i in range(n)]
 
 def getProbability(value, distribution, values):
     """